@@ -0,0 +1,119 @@
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from cli import parse_downscale
+from processing.detector import MASK_OPTIONS
+from processing.fitting import load_saved_params
+from processing.parallel import SUMMARY_FIELDS, process_batch
+from utils.utils import load_json
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v")
+
+
+def expand_sources(sources):
+    """
+    Video files named by a list of paths, directories and glob patterns.
+    """
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            matches = [
+                os.path.join(source, name)
+                for name in os.listdir(source)
+                if name.lower().endswith(VIDEO_EXTENSIONS)
+            ]
+        else:
+            matches = glob.glob(source)
+        paths.extend(sorted(matches))
+    # keep the first occurrence of every file
+    return list(dict.fromkeys(paths))
+
+
+def format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Track and fit a batch of pendulum videos, one video per process."
+    )
+    parser.add_argument("sources", nargs="+", help="video files, directories or glob patterns")
+    parser.add_argument(
+        "--mask", choices=MASK_OPTIONS, default="Color Detection", help="detection mode"
+    )
+    parser.add_argument("--hsv", help="HSV thresholds JSON (default: data/json/hsv.json)")
+    parser.add_argument(
+        "--roi",
+        action="store_true",
+        help="search only a window around the predicted bob position",
+    )
+    parser.add_argument(
+        "--downscale",
+        default="1",
+        help="locate the bob on a frame downscaled by this factor, or 'auto'",
+    )
+    parser.add_argument("--workers", type=int, help="number of processes (default: all cores)")
+    parser.add_argument(
+        "--warm-start",
+        nargs="?",
+        const="",
+        help="start the fits from a saved fit of the same rig (default: data/json/parameters.json)",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse the detections of earlier runs with the same videos and settings",
+    )
+    parser.add_argument("--output", help="write the summary table to this CSV file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    video_paths = expand_sources(args.sources)
+    if not video_paths:
+        print("No video files found")
+        return 1
+
+    warm_start = None
+    if args.warm_start is not None:
+        warm_start = load_saved_params(args.warm_start or None)
+
+    start = time.perf_counter()
+    rows = process_batch(
+        video_paths,
+        args.mask,
+        hsv_vals=load_json(args.hsv) if args.hsv else None,
+        workers=args.workers,
+        roi=args.roi,
+        downscale=parse_downscale(args.downscale),
+        warm_start=warm_start,
+        cache=args.cache,
+        on_row=lambda row: print(
+            f"{row['video']}: {row['error'] or 'done'} ({row['wall_time']:.1f} s)",
+            file=sys.stderr,
+        ),
+    )
+    print(f"{len(rows)} videos in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(SUMMARY_FIELDS)
+        for row in rows:
+            writer.writerow(format_value(row[field]) for field in SUMMARY_FIELDS)
+    finally:
+        if args.output:
+            output.close()
+    return 0 if all(row["error"] is None for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from processing.detector import MASK_OPTIONS
+from processing.detection_cache import DetectionCache
+from processing.engine import TrackingEngine
+from processing.fitting import load_saved_params
+from processing.multi_tracker import MultiBobEngine
+from processing.parallel import process_parallel
+from utils.track_file import export_csv, make_track, save_track
+from utils.metrics import Metrics
+from utils.track_writer import TrackWriter
+from utils.utils import load_json
+
+
+def parse_source(source):
+    # camera indices are passed as plain integers
+    return int(source) if source.isdigit() else source
+
+
+def parse_downscale(downscale):
+    return downscale if downscale == "auto" else int(downscale)
+
+
+def to_serializable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def changed_options(parser, args, names):
+    """
+    Command line flags among `names` that were set to a non-default value.
+    """
+    return [
+        "--" + name.replace("_", "-")
+        for name in names
+        if getattr(args, name) != parser.get_default(name)
+    ]
+
+
+# options that only apply to a single engine reading the video in order
+WORKERS_UNSUPPORTED = (
+    "track_capacity",
+    "threaded",
+    "detect_interval",
+    "max_uncertainty",
+    "sample_rate",
+    "calibration_samples",
+    "cache",
+    "record",
+    "metrics",
+)
+
+# the multi-bob engine detects full frames in order with its own tracker
+BOBS_UNSUPPORTED = (
+    "track_capacity",
+    "roi",
+    "downscale",
+    "threaded",
+    "detect_interval",
+    "max_uncertainty",
+    "sample_rate",
+    "calibration_samples",
+    "workers",
+    "cache",
+    "record",
+)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Track the pendulum bob and fit the oscillator without the GUI."
+    )
+    parser.add_argument("source", help="video path, URL or camera index")
+    parser.add_argument(
+        "--mask", choices=MASK_OPTIONS, default="Color Detection", help="detection mode"
+    )
+    parser.add_argument("--hsv", help="HSV thresholds JSON (default: data/json/hsv.json)")
+    parser.add_argument("--max-frames", type=int, help="stop after this many frames")
+    parser.add_argument(
+        "--track-capacity",
+        type=int,
+        help="keep only this many of the latest detections of a live source",
+    )
+    parser.add_argument(
+        "--roi",
+        action="store_true",
+        help="search only a window around the predicted bob position",
+    )
+    parser.add_argument(
+        "--downscale",
+        default="1",
+        help="locate the bob on a frame downscaled by this factor, or 'auto'",
+    )
+    parser.add_argument(
+        "--threaded",
+        action="store_true",
+        help="decode on a separate thread from detection",
+    )
+    parser.add_argument(
+        "--detect-interval",
+        type=int,
+        default=1,
+        help="run the detector on every Nth frame; the frames in between are forecast by a Kalman "
+        "filter and interpolated in the track once the next detection arrives",
+    )
+    parser.add_argument(
+        "--max-uncertainty",
+        type=float,
+        help="detect earlier when the predicted position is less certain than this many pixels",
+    )
+    parser.add_argument(
+        "--sample-rate",
+        type=float,
+        help="analyse only this many frames per second of video, grabbing the rest without decoding them for display",
+    )
+    parser.add_argument(
+        "--calibration-samples",
+        type=int,
+        default=0,
+        help="calibrate up front on this many frames spread over the calibration window",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="process a video file in parallel frame ranges on this many processes",
+    )
+    parser.add_argument(
+        "--warm-start",
+        nargs="?",
+        const="",
+        help="start the fit from a saved fit of the same rig (default: data/json/parameters.json)",
+    )
+    parser.add_argument(
+        "--track",
+        help="write the track (frame, time, x, y, x_transformed) to a .npy file, or CSV for .csv",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse the detections of an earlier run with the same video and settings",
+    )
+    parser.add_argument(
+        "--record",
+        help="stream raw detections (frame, time, x, y) to this .npy file while running",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="write per-stage timings and counters to this JSON file, or CSV for .csv",
+    )
+    parser.add_argument(
+        "--bobs",
+        type=int,
+        default=1,
+        help="track and fit this many bobs at once, numbered left to right",
+    )
+    parser.add_argument(
+        "--max-distance",
+        type=float,
+        default=60.0,
+        help="largest jump in pixels between frames matched to the same bob (with --bobs)",
+    )
+    parser.add_argument("--output", help="write the results JSON to this file")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.bobs > 1:
+        unsupported = changed_options(parser, args, BOBS_UNSUPPORTED)
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --bobs")
+    elif args.workers:
+        unsupported = changed_options(parser, args, WORKERS_UNSUPPORTED)
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --workers")
+    hsv_vals = load_json(args.hsv) if args.hsv else None
+    warm_start = None
+    if args.warm_start is not None:
+        warm_start = load_saved_params(args.warm_start or None)
+
+    start = time.perf_counter()
+    if args.workers:
+        results = process_parallel(
+            args.source,
+            args.mask,
+            hsv_vals=hsv_vals,
+            workers=args.workers,
+            roi=args.roi,
+            warm_start=warm_start,
+            max_frames=args.max_frames,
+            downscale=parse_downscale(args.downscale),
+        )
+        return report(args, results, time.perf_counter() - start)
+
+    if args.bobs > 1:
+        return track_bobs(args, hsv_vals, warm_start, start)
+
+    engine = TrackingEngine(
+        parse_source(args.source),
+        args.mask,
+        hsv_vals=hsv_vals,
+        track_capacity=args.track_capacity,
+        roi=args.roi,
+        downscale=parse_downscale(args.downscale),
+        metrics=Metrics() if args.metrics else None,
+        detect_interval=args.detect_interval,
+        max_uncertainty=args.max_uncertainty,
+        sample_rate=args.sample_rate,
+        calibration_samples=args.calibration_samples,
+    )
+    engine.warm_start = warm_start
+    if args.record:
+        engine.recorder = TrackWriter(args.record)
+    try:
+        results = engine.run(
+            max_frames=args.max_frames,
+            threaded=args.threaded,
+            cache=DetectionCache() if args.cache else None,
+        )
+    except KeyboardInterrupt:
+        # live sources run until interrupted
+        engine.release()
+        results = engine.results()
+    finally:
+        if engine.recorder is not None:
+            engine.recorder.close()
+        if args.metrics:
+            engine.metrics.save(args.metrics)
+    return report(args, results, time.perf_counter() - start)
+
+
+def track_bobs(args, hsv_vals, warm_start, start):
+    engine = MultiBobEngine(
+        parse_source(args.source),
+        args.bobs,
+        args.mask,
+        hsv_vals=hsv_vals,
+        max_distance=args.max_distance,
+        metrics=Metrics() if args.metrics else None,
+    )
+    engine.warm_start = warm_start
+    try:
+        results = engine.run(max_frames=args.max_frames)
+    except KeyboardInterrupt:
+        engine.release()
+        results = engine.results()
+    finally:
+        if args.metrics:
+            engine.engine.metrics.save(args.metrics)
+
+    frame_rate = results["frame_rate"] or 1
+    records = []
+    for number, bob in enumerate(results["bobs"]):
+        track = bob.pop("track")
+        x_transformed = bob.pop("x_transformed")
+        if len(x_transformed) != len(track):
+            # no circle fit, so there is no swing coordinate
+            x_transformed = np.full(len(track), np.nan)
+        records.append(
+            make_track(
+                track["frame"],
+                track["frame"] / frame_rate,
+                track["x"],
+                track["y"],
+                x_transformed=x_transformed,
+                bob=np.full(len(track), number),
+            )
+        )
+    results["wall_time"] = time.perf_counter() - start
+    if args.track:
+        write_track(args.track, np.concatenate(records))
+    return print_results(args, results)
+
+
+def write_track(filename, records):
+    if filename.lower().endswith(".csv"):
+        export_csv(filename, records)
+    else:
+        save_track(filename, records)
+
+
+def report(args, results, elapsed):
+    track = results.pop("track")
+    x_transformed = results.pop("x_transformed")
+    predicted = results.pop("predicted", None)
+    x_predicted = results.pop("x_predicted", None)
+    results["wall_time"] = elapsed
+    if predicted is not None and len(predicted):
+        results["predicted_frames"] = len(predicted)
+    if args.track:
+        frame_rate = results["frame_rate"] or 1
+        extra = {"x_transformed": x_transformed}
+        if predicted is not None and len(predicted):
+            # interleave the predicted centers, flagged with measured = 0
+            track = np.concatenate([track, predicted])
+            extra = {
+                "x_transformed": np.concatenate([x_transformed, x_predicted]),
+                "measured": np.arange(len(track)) < len(x_transformed),
+            }
+            order = np.argsort(track["frame"], kind="stable")
+            track = track[order]
+            extra = {name: values[order] for name, values in extra.items()}
+        records = make_track(
+            track["frame"],
+            track["frame"] / frame_rate,
+            track["x"],
+            track["y"],
+            **extra,
+        )
+        write_track(args.track, records)
+    return print_results(args, results)
+
+
+def print_results(args, results):
+    output = json.dumps(results, indent=2, default=to_serializable)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import numpy as np
+from utils.utils import get_project_root
+
+project_root = get_project_root(os.path.dirname(os.path.abspath(__file__)))
+data_folder = os.path.join(project_root, "data")
+
+
+# Function to fingerprint a video file without reading all of it
+def video_fingerprint(video_path, samples=16, sample_size=65536):
+    """
+    Fingerprint a video file by its size, modification time and a hash of
+    blocks sampled evenly through the file.
+
+    Args:
+        video_path (str): Path of the video file.
+        samples (int): Number of sampled blocks. Default is 16.
+        sample_size (int): Bytes per sampled block. Default is 65536.
+
+    Returns:
+        dict: Size, mtime and the hex digest of the sampled blocks.
+    """
+    stat = os.stat(video_path)
+    digest = hashlib.sha256()
+    with open(video_path, "rb") as f:
+        for offset in np.linspace(0, max(stat.st_size - sample_size, 0), samples):
+            f.seek(int(offset))
+            digest.update(f.read(sample_size))
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sample_hash": digest.hexdigest(),
+    }
+
+
+class DetectionCache:
+    """
+    Content-addressed on-disk cache of per-frame detections.
+
+    An entry is keyed by the video fingerprint and the detector settings, and
+    holds the detections of a complete run, so a repeated run can go straight
+    to calibration and fitting. Entries are .npz files; reading one marks it
+    as recently used, and the least recently used entries are evicted once
+    the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, folder=None, max_bytes=256 * 1024 * 1024):
+        """
+        Initialize the DetectionCache.
+
+        Args:
+            folder (str): Cache directory. Default is data/cache.
+            max_bytes (int): Size limit of all entries together. Default is 256 MiB.
+        """
+        self.folder = folder or os.path.join(data_folder, "cache")
+        self.max_bytes = max_bytes
+        os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def key(video_path, config):
+        """
+        Cache key of a video and a detector configuration.
+
+        Args:
+            video_path (str): Path of the video file.
+            config (dict): JSON-serializable detector settings.
+
+        Returns:
+            str: Hex digest naming the entry.
+        """
+        content = {"video": video_fingerprint(video_path), "config": config}
+        encoded = json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.folder, key + ".npz")
+
+    def get(self, key):
+        """
+        Look up an entry.
+
+        Returns:
+            tuple: (track, radius_bob, processed_frames, predicted), or None on a
+            miss. predicted holds the centers filled in between detections and
+            is empty for runs that detected every frame.
+        """
+        path = self.path(key)
+        try:
+            with np.load(path) as entry:
+                track = entry["track"]
+                if "predicted" in entry.files:
+                    predicted = entry["predicted"]
+                else:
+                    predicted = np.empty(0, track.dtype)
+                result = (
+                    track,
+                    float(entry["radius_bob"]),
+                    int(entry["processed_frames"]),
+                    predicted,
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+        # the modification time orders the entries for eviction; another
+        # process may have evicted the entry since it was read
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return result
+
+    def put(self, key, track, radius_bob, processed_frames, predicted=None):
+        """
+        Store an entry and evict the least recently used ones over the size limit.
+        """
+        if predicted is None:
+            predicted = np.empty(0, track.dtype)
+        path = self.path(key)
+        # per-process name, two workers may store the same entry at once
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                track=track,
+                radius_bob=radius_bob,
+                processed_frames=processed_frames,
+                predicted=predicted,
+            )
+        # readers never see a partly written entry
+        os.replace(temp_path, path)
+        self.evict()
+
+    def evict(self):
+        # several processes can share the folder, so entries may vanish at any point
+        entries = []
+        for name in os.listdir(self.folder):
+            if name.endswith(".npz"):
+                try:
+                    stat = os.stat(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.folder):
+            if name.endswith(".npz"):
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    pass
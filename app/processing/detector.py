@@ -1,9 +1,29 @@
 import cv2
-import cvzone
-from cvzone.ColorModule import ColorFinder
 import numpy as np
+from collections import namedtuple
+
+# A single bob detection. center is (x, y), bbox is (x, y, w, h) and contour is
+# the outline the detection came from, or None for Hough circles.
+Observation = namedtuple(
+    "Observation", ["center", "radius", "area", "confidence", "bbox", "contour"]
+)
+
+MASK_OPTIONS = ["Color Detection", "Edge Detection", "Circle Detection"]
+
 
 class ImageProcessor:
+    # Canny thresholds of the edge mask
+    canny_thresholds = (50, 150)
+    # HoughCircles parameters at full resolution
+    hough_params = {
+        "dp": 1,
+        "min_dist": 20,
+        "param1": 50,
+        "param2": 30,
+        "min_radius": 5,
+        "max_radius": 50,
+    }
+
     def __init__(self, hsv_vals: dict, gaussian_kernel: tuple = (17, 17)):
         """
         Initialize the ImageProcessor.
@@ -13,129 +33,306 @@ class ImageProcessor:
             gaussian_kernel (tuple): Gaussian kernel size for image smoothing. Default is (17, 17).
         """
         self.hsv_vals = hsv_vals
-        self.color_finder = ColorFinder()
         self.gaussian_kernel = gaussian_kernel
+        self._hsv_buffer = None
+
+    @property
+    def hsv_vals(self):
+        return self._hsv_vals
 
-    def get_contours(self, frame, mask, min_area: int = 200):
+    @hsv_vals.setter
+    def hsv_vals(self, hsv_vals):
+        # threshold bounds are rebuilt only when the HSV range changes
+        self._hsv_vals = dict(hsv_vals)
+        self._hsv_lower = np.array(
+            [hsv_vals["hmin"], hsv_vals["smin"], hsv_vals["vmin"]], dtype=np.uint8
+        )
+        self._hsv_upper = np.array(
+            [hsv_vals["hmax"], hsv_vals["smax"], hsv_vals["vmax"]], dtype=np.uint8
+        )
+
+    def config(self):
+        """
+        Settings that determine the detections, e.g. for a cache key.
         """
-        Get contours from the input frame using a mask.
+        return {
+            "hsv_vals": dict(self.hsv_vals),
+            "gaussian_kernel": list(self.gaussian_kernel),
+            "canny_thresholds": list(self.canny_thresholds),
+            "hough_params": dict(self.hough_params),
+        }
+
+    def detect(self, frame, mask_option="Color Detection", min_area: int = 200, scale=1):
+        """
+        Detect the bob and return it as an Observation.
 
         Args:
             frame (numpy.ndarray): Input image frame.
-            mask (numpy.ndarray): Mask to filter objects of interest.
-            min_area (int): Minimum area for detected contours. Default is 200.
+            mask_option (str): One of MASK_OPTIONS.
+            min_area (int): Minimum area of a detection. Default is 200.
+            scale (float): Size of the frame relative to the full resolution. Default is 1.
+
+        Returns:
+            tuple: (observation, mask). observation is None when nothing was found,
+            mask is None in "Circle Detection" mode where no mask is built.
+        """
+        if mask_option == "Circle Detection":
+            return self.detect_circle(frame, min_area, scale), None
+
+        if mask_option == "Color Detection":
+            mask = self.get_color_mask(frame)
+        else:
+            mask = self.get_edges(frame, scale)
+        return self.observe_mask(mask, min_area), mask
+
+    @staticmethod
+    def observe_mask(mask, min_area: int = 200):
+        """
+        Turn the largest blob of a mask into an Observation.
+
+        Args:
+            mask (numpy.ndarray): Binary mask.
+            min_area (int): Minimum area of the blob. Default is 200.
 
         Returns:
-            dict: Dictionary containing mask, image with drawn contours, and list of detected contours.
+            Observation: The largest blob, or None if no blob exceeds min_area.
         """
-        frame_with_contours, contours = cvzone.findContours(
-            frame, mask, minArea=min_area
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        best_contour = None
+        best_area = min_area
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area > best_area:
+                best_contour = contour
+                best_area = area
+
+        if best_contour is None:
+            return None
+        return ImageProcessor.contour_observation(best_contour, best_area)
+
+    @staticmethod
+    def observe_mask_all(mask, min_area: int = 200):
+        """
+        Turn every blob of a mask into an Observation.
+
+        Args:
+            mask (numpy.ndarray): Binary mask.
+            min_area (int): Minimum area of a blob. Default is 200.
+
+        Returns:
+            list: Observations of the blobs larger than min_area, largest first.
+        """
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        blobs = [(cv2.contourArea(contour), contour) for contour in contours]
+        blobs = sorted((blob for blob in blobs if blob[0] > min_area), key=lambda blob: -blob[0])
+        return [ImageProcessor.contour_observation(contour, area) for area, contour in blobs]
+
+    @staticmethod
+    def contour_observation(contour, area):
+        x, y, w, h = cv2.boundingRect(contour)
+        radius = (w + h) / 4
+        return Observation(
+            center=(x + w // 2, y + h // 2),
+            radius=radius,
+            area=area,
+            confidence=min(1.0, area / (np.pi * radius**2)),
+            bbox=(x, y, w, h),
+            contour=contour,
         )
 
-        if contours:
-            cx, cy = contours[0]["center"]
-            area = int(contours[0]["area"])
-            cv2.putText(
-                frame_with_contours,
-                f"({cx}, {cy}, {area})",
-                (cx, cy + 40),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 0, 0),
-                2,
-                cv2.LINE_4,
-            )
+    def detect_all(self, frame, mask_option="Color Detection", min_area: int = 200, scale=1):
+        """
+        Detect every bob in a frame with a single mask (or Hough) pass.
 
-        return {
-            "mask": mask,
-            "image_contours": frame_with_contours,
-            "contours": contours,
-        }
+        Args:
+            frame (numpy.ndarray): Input image frame.
+            mask_option (str): One of MASK_OPTIONS.
+            min_area (int): Minimum area of a detection. Default is 200.
+            scale (float): Size of the frame relative to the full resolution. Default is 1.
 
-    def get_color_mask(self, frame):
+        Returns:
+            tuple: (observations, mask) with the detections largest first; mask is
+            None in "Circle Detection" mode.
         """
-        Get a mask for detecting objects based on color.
+        if mask_option == "Circle Detection":
+            return self.circle_observations(frame, min_area, scale), None
+
+        if mask_option == "Color Detection":
+            mask = self.get_color_mask(frame)
+        else:
+            mask = self.get_edges(frame, scale)
+        return self.observe_mask_all(mask, min_area), mask
+
+    def detect_circle(self, frame, min_area: int = 200, scale=1):
+        """
+        Detect the best Hough circle directly as an Observation.
 
         Args:
             frame (numpy.ndarray): Input image frame.
+            min_area (int): Minimum area of the circle. Default is 200.
+            scale (float): Size of the frame relative to the full resolution. Default is 1.
 
         Returns:
-            numpy.ndarray: Color mask for objects matching the specified HSV values.
+            Observation: The circle with the largest radius, or None.
+        """
+        observations = self.circle_observations(frame, min_area, scale)
+        return observations[0] if observations else None
+
+    def circle_observations(self, frame, min_area: int = 200, scale=1):
         """
-        _, mask = self.color_finder.update(frame, self.hsv_vals)
+        Every Hough circle larger than min_area as an Observation, largest first.
+        """
+        circles = self._find_circles(frame, scale)
+        if circles is None:
+            return []
+
+        observations = []
+        for x, y, r in sorted(circles[0].tolist(), key=lambda c: -c[2]):
+            area = np.pi * r**2
+            if area <= min_area:
+                break
+            observations.append(
+                Observation(
+                    center=(x, y),
+                    radius=r,
+                    area=area,
+                    confidence=1.0,
+                    bbox=(int(x - r), int(y - r), int(2 * r), int(2 * r)),
+                    contour=None,
+                )
+            )
+        return observations
+
+    @staticmethod
+    def observation_mask(shape, observation):
+        """
+        Rasterize an observation into a mask, for display only.
+
+        Args:
+            shape (tuple): Shape of the frame.
+            observation (Observation): Detection to draw, or None.
+
+        Returns:
+            numpy.ndarray: Mask with the detection filled in.
+        """
+        mask = np.zeros(shape[:2], dtype=np.uint8)
+        if observation is None:
+            return mask
+        if observation.contour is not None:
+            cv2.drawContours(mask, [observation.contour], -1, 255, -1)
+        else:
+            center = (int(round(observation.center[0])), int(round(observation.center[1])))
+            cv2.circle(mask, center, int(round(observation.radius)), 255, -1)
         return mask
 
-    def get_edges(self, frame):
+    @staticmethod
+    def annotate(image, observation):
         """
-        Detect edges in the input image frame.
+        Draw a detection onto a frame in place.
+
+        Detection never draws on the frames it inspects; call this only for
+        frames that are going to be displayed.
 
         Args:
-            frame (numpy.ndarray): Input image frame.
+            image (numpy.ndarray): Frame to draw on.
+            observation (Observation): Detection to draw, or None.
 
         Returns:
-            numpy.ndarray: Image containing detected edges.
+            numpy.ndarray: The same frame, with the detection drawn.
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, self.gaussian_kernel, 0)
-        edges = cv2.Canny(blurred, 50, 150)
-        return edges
+        if observation is None:
+            return image
 
-    def _get_circles_mask(self, frame, best_circle: bool = False):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, self.gaussian_kernel, 0)
-        circles = cv2.HoughCircles(
-            blurred,
-            cv2.HOUGH_GRADIENT,
-            dp=1,
-            minDist=20,
-            param1=50,
-            param2=30,
-            minRadius=5,
-            maxRadius=50,
+        color = (255, 0, 0)
+        x, y, w, h = observation.bbox
+        cx, cy = int(round(observation.center[0])), int(round(observation.center[1]))
+        if observation.contour is not None:
+            cv2.drawContours(image, observation.contour, -1, color, 3)
+        else:
+            cv2.circle(image, (cx, cy), int(round(observation.radius)), color, 3)
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, 2)
+        cv2.circle(image, (cx, cy), 5, color, cv2.FILLED)
+        cv2.putText(
+            image,
+            f"({cx}, {cy}, {int(observation.area)})",
+            (cx, cy + 40),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (0, 0, 0),
+            2,
+            cv2.LINE_4,
         )
+        return image
 
-        circle_mask = np.zeros_like(gray)
-        max_acc = 0
-        best_circle_coords = None
+    def get_color_mask(self, frame):
+        """
+        Get a mask for detecting objects based on color.
 
-        if circles is not None:
-            circles = np.round(circles[0, :]).astype("int")
-            for x, y, r in circles:
-                if best_circle:
-                    acc = r
-                    if acc > max_acc:
-                        max_acc = acc
-                        best_circle_coords = (x, y, r)
-                else:
-                    cv2.circle(circle_mask, (x, y), r, 255, -1)
+        Args:
+            frame (numpy.ndarray): Input image frame.
 
-        if best_circle:
-            if best_circle_coords is not None:
-                x, y, r = best_circle_coords
-                cv2.circle(circle_mask, (x, y), r, 255, -1)
+        Returns:
+            numpy.ndarray: Color mask for objects matching the specified HSV values.
+        """
+        if self._hsv_buffer is None or self._hsv_buffer.shape != frame.shape:
+            self._hsv_buffer = np.empty_like(frame)
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=self._hsv_buffer)
+        return cv2.inRange(hsv, self._hsv_lower, self._hsv_upper)
 
-        return circle_mask
+    def scaled_kernel(self, scale=1):
+        """
+        Gaussian kernel size for a frame downscaled by `scale`, kept odd.
+        """
+        if scale == 1:
+            return self.gaussian_kernel
+        return tuple(max(3, int(k * scale) | 1) for k in self.gaussian_kernel)
 
-    def get_circles(self, frame):
+    def get_edges(self, frame, scale=1):
         """
-        Detect and return circles in the input frame.
+        Detect edges in the input image frame.
 
         Args:
             frame (numpy.ndarray): Input image frame.
+            scale (float): Size of the frame relative to the full resolution. Default is 1.
 
         Returns:
-            numpy.ndarray: Mask with detected circles.
+            numpy.ndarray: Image containing detected edges.
         """
-        return self._get_circles_mask(frame)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        blurred = cv2.GaussianBlur(gray, self.scaled_kernel(scale), 0)
+        edges = cv2.Canny(blurred, *self.canny_thresholds)
+        return edges
+
+    def _find_circles(self, frame, scale=1):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        blurred = cv2.GaussianBlur(gray, self.scaled_kernel(scale), 0)
+        hough = self.hough_params
+        return cv2.HoughCircles(
+            blurred,
+            cv2.HOUGH_GRADIENT,
+            dp=hough["dp"],
+            minDist=max(1, hough["min_dist"] * scale),
+            param1=hough["param1"],
+            param2=hough["param2"],
+            minRadius=max(1, int(hough["min_radius"] * scale)),
+            maxRadius=int(hough["max_radius"] * scale) + 1,
+        )
 
-    def get_best_circle(self, frame):
+    @staticmethod
+    def subpixel_center(observation):
         """
-        Detect and return the best circle in the input frame.
+        Centroid of an observation with sub-pixel accuracy.
 
         Args:
-            frame (numpy.ndarray): Input image frame.
+            observation (Observation): Detection to refine.
 
         Returns:
-            numpy.ndarray: Mask with the best detected circle.
+            tuple: (cx, cy) as floats. Circles already have a sub-pixel center,
+            degenerate contours keep their integer center.
         """
-        return self._get_circles_mask(frame, best_circle=True)
\ No newline at end of file
+        if observation.contour is None:
+            return observation.center
+        moments = cv2.moments(observation.contour)
+        if moments["m00"] == 0:
+            return observation.center
+        return moments["m10"] / moments["m00"], moments["m01"] / moments["m00"]
\ No newline at end of file
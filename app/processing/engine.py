@@ -0,0 +1,940 @@
+import os
+import sys
+import cv2
+import numpy as np
+from processing.detector import ImageProcessor
+from processing.kalman import KalmanTracker
+from processing.fitting import (
+    fit_oscillator,
+    params_to_dict,
+    IncrementalCircleFit,
+    refine_circle,
+)
+from processing.pipeline import FramePipeline
+from processing.roi import SearchWindow, shift_observation
+from utils.metrics import NO_METRICS
+from utils.track_buffer import TrackBuffer
+from scipy.optimize import least_squares
+from utils.utils import (
+    load_json,
+    get_project_root,
+    circle_residuals,
+    rotate_opencv_point,
+)
+
+project_root = get_project_root(os.path.dirname(os.path.abspath(__file__)))
+data_folder = os.path.join(project_root, "data")
+
+
+# Function to calculate the tilt of the swing from the fitted circle
+def rotation_angle(fitted_a, fitted_b, mean_point):
+    """
+    Angle that rotates the swing so that its rest position points down.
+
+    Args:
+        fitted_a: X-coordinate of the circle center (pivot).
+        fitted_b: Y-coordinate of the circle center (pivot).
+        mean_point (tuple): Mean (x, y) of the bob positions.
+
+    Returns:
+        float: Rotation angle in radians.
+    """
+    # Calculate the angles of data points with respect to the circle's center
+    mean_x, mean_y = mean_point
+
+    OFFSET = 90
+    return np.arctan2(fitted_b - mean_y, fitted_a - mean_x) + np.radians(OFFSET)
+
+
+# Function to pick well-spread frames of a window
+def spread_samples(length, samples):
+    """
+    Indices of about `samples` frames spread over a window of `length` frames.
+
+    The window is split into equal strata and each pick is offset inside its
+    stratum by a golden-ratio sequence, so a swing period that divides the
+    stride cannot alias all picks onto a few phases of the swing.
+
+    Args:
+        length (int): Number of frames in the window.
+        samples (int): Number of frames to pick.
+
+    Returns:
+        numpy.ndarray: Sorted unique frame indices in [0, length).
+    """
+    if samples >= length:
+        return np.arange(length)
+    golden = (np.sqrt(5) - 1) / 2
+    offsets = (np.arange(samples) * golden) % 1
+    return np.unique(((np.arange(samples) + offsets) * length / samples).astype(int))
+
+
+class TrackingEngine:
+    """
+    Qt-free bob tracking and fitting pipeline.
+
+    The engine owns the video capture, the ImageProcessor and all of the
+    calibration state, so it can be driven from a QThread, a script or the
+    command line alike. Frames are produced as fast as they can be decoded.
+    """
+
+    # initial values
+    initial_circle_guess = np.array([248, 8, 435])
+    frame_offset = 50
+    calibration_frames = 2000
+    # live detections between circle refits
+    live_calibration_interval = 25
+    live_refine_nfev = 5
+    min_area = 200
+    coarse_bob_radius = 8
+
+    def __init__(
+        self,
+        video_path,
+        mask_option="Color Detection",
+        hsv_vals=None,
+        on_params=None,
+        on_progress=None,
+        track_capacity=None,
+        roi=False,
+        downscale=1,
+        metrics=None,
+        detect_interval=1,
+        max_uncertainty=None,
+        sample_rate=None,
+        calibration_samples=0,
+    ):
+        """
+        Initialize the TrackingEngine.
+
+        Args:
+            video_path (str | int): Path or URL of a video, or a camera index.
+            mask_option (str): "Color Detection", "Edge Detection" or "Circle Detection".
+            hsv_vals (dict): HSV thresholds. Defaults to the values in data/json/hsv.json.
+            on_params (callable): Called with the params dict after every circle fit.
+            on_progress (callable): Called with the calibration progress in percent.
+            track_capacity (int): Keep only this many of the latest detections of a
+                live source. Default is to keep the whole track.
+            roi (bool): Search only a window around the predicted bob position,
+                falling back to the full frame when the bob is lost. Default is False.
+            downscale (int | str): Locate the bob on a frame downscaled by this factor
+                and refine it at full resolution. "auto" picks the factor from the
+                measured bob radius. Default is 1 (full resolution only).
+            metrics (Metrics): Collects per-stage timings and counters. Default is none.
+            detect_interval (int): Run the detector on at most every this many frames
+                and predict the bob position with a Kalman filter in between.
+                Default is 1 (detect on every frame).
+            max_uncertainty (float): Detect earlier when the predicted position is
+                less certain than this many pixels (standard deviation). Default is
+                None (detect only every detect_interval frames).
+            sample_rate (float): Analyse only this many frames per second of video;
+                the frames in between are grabbed but never retrieved. Default is
+                None (every frame).
+            calibration_samples (int): Calibrate a video file up front on this many
+                frames spread over the calibration window, grabbing the rest,
+                instead of on every frame as they stream by. Default is 0.
+        """
+        self._run_flag = True
+        self.video_path = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        self.frame_rate = int(self.cap.get(cv2.CAP_PROP_FPS))
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        self.height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        self.mask_option = mask_option
+        self.metrics = metrics or NO_METRICS
+        self.on_params = on_params
+        self.on_progress = on_progress
+        self._last_progress = None
+
+        # internal data
+        if hsv_vals is None:
+            hsv_vals = load_json(os.path.join(data_folder, "json", "hsv.json"))
+        self.hsv_vals = hsv_vals
+        self.data_points = TrackBuffer(capacity=self.calibration_frames)
+        self.track = (
+            TrackBuffer(capacity=track_capacity, ring=True)
+            if self.is_live and track_capacity
+            else TrackBuffer()
+        )
+        self.circle_params = self.initial_circle_guess
+        self.circle_fit = IncrementalCircleFit()
+        self._rng = np.random.default_rng()
+        self.calibrated = self.is_live
+        self._calibration_length = self.calibration_length()
+        self.params = {
+            "angle_rad": 0,
+        }
+
+        # image processor initialization
+        self.processor = ImageProcessor(self.hsv_vals)
+        self.search_window = SearchWindow() if roi else None
+        self.downscale = downscale
+        self.keep_mask = False
+        # previous oscillator fit of the same rig to start the fit from
+        self.warm_start = None
+        # optional TrackWriter that receives every detection as it is made
+        self.recorder = None
+
+        # predict-correct tracking; self.track keeps only the measured centers
+        self.detect_interval = max(1, int(detect_interval))
+        self.max_uncertainty = max_uncertainty
+        self.predictor = KalmanTracker() if self.detect_interval > 1 else None
+        # bounded like self.track, so a long live session keeps constant memory
+        self.predicted = (
+            TrackBuffer(capacity=track_capacity, ring=True)
+            if self.is_live and track_capacity
+            else TrackBuffer()
+        )
+
+        # sampling; frame numbers always count source frames
+        self.sample_rate = sample_rate
+        self.calibration_samples = calibration_samples
+
+    @property
+    def is_live(self):
+        return self.total_frames == -1
+
+    def pyramid_factor(self):
+        """
+        Downscale factor of the coarse detection level.
+
+        With downscale="auto" the factor is picked so the bob keeps a radius
+        of about coarse_bob_radius pixels on the coarse level.
+        """
+        if self.downscale != "auto":
+            return max(1, int(self.downscale))
+        radius_bob = self.params.get("radius_bob", 0)
+        return max(1, int(radius_bob // self.coarse_bob_radius))
+
+    def predict(self, frame_number):
+        """
+        Predicted bob position for a frame that does not need the detector.
+
+        The detector runs when the filter has no lock yet, when detect_interval
+        frames have passed since the last detection, or when the prediction
+        is less certain than max_uncertainty.
+
+        Args:
+            frame_number (int): Index of the frame.
+
+        Returns:
+            tuple: Predicted (x, y), or None if the frame must be detected.
+        """
+        predictor = self.predictor
+        if predictor is None:
+            return None
+        position = predictor.predict(frame_number)
+        if not predictor.ready:
+            return None
+        if frame_number - predictor.last_measured >= self.detect_interval:
+            return None
+        if self.max_uncertainty is not None and predictor.position_std() > self.max_uncertainty:
+            return None
+        return position
+
+    def interpolate_predicted(self):
+        """
+        Replace the forecasts made since the previous detection with an
+        interpolation between it and the detection that just arrived.
+
+        The per-frame results already handed out keep the forecast; the
+        stored predicted track, and so results() and the track files, get
+        the interpolated positions.
+        """
+        previous = self.predictor.previous_anchor
+        if previous is None or len(self.predicted) == 0:
+            return
+        frames = self.predicted.column("frame")
+        gap = frames[np.searchsorted(frames, previous[0], side="right"):]
+        if len(gap) == 0:
+            return
+        positions = self.predictor.interpolate(gap)
+        self.predicted.set_tail("x", positions[:, 0])
+        self.predicted.set_tail("y", positions[:, 1])
+
+    def detect(self, frame, frame_number=0):
+        """
+        Detect the bob in a frame.
+
+        Args:
+            frame (numpy.ndarray): Input image frame.
+            frame_number (int): Index of the frame, used by the ROI search window.
+
+        Returns:
+            tuple: (observation, mask). observation is None when the bob was not
+            found, mask is None unless keep_mask is set.
+        """
+        if self.search_window is None:
+            return self.detect_full_frame(frame)
+
+        bounds = self.search_window.bounds(frame_number, frame.shape)
+        observation = None
+        if bounds is not None:
+            observation, mask = self.detect_in_window(frame, bounds)
+        if observation is None:
+            # target lost, fall back to a full-frame search
+            observation, mask = self.detect_full_frame(frame)
+
+        self.search_window.update(
+            frame_number, observation.center if observation else None
+        )
+        return observation, mask
+
+    def detect_full_frame(self, frame):
+        """
+        Detect the bob anywhere in the frame.
+
+        When a downscale factor is set, the bob is first located on a
+        downscaled copy of the frame and then refined to a sub-pixel centroid
+        at full resolution inside a small window around the coarse hit.
+
+        Args:
+            frame (numpy.ndarray): Input image frame.
+
+        Returns:
+            tuple: (observation, mask), see detect.
+        """
+        factor = self.pyramid_factor()
+        if factor > 1:
+            bounds = self.locate_coarse(frame, factor)
+            if bounds is not None:
+                observation, mask = self.detect_in_window(frame, bounds)
+                if observation is not None:
+                    center = self.processor.subpixel_center(observation)
+                    return observation._replace(center=center), mask
+
+        observation, mask = self.processor.detect(frame, self.mask_option, self.min_area)
+        return observation, self.display_mask(frame, observation, mask)
+
+    def locate_coarse(self, frame, factor):
+        """
+        Locate the bob on a downscaled copy of the frame.
+
+        Args:
+            frame (numpy.ndarray): Input image frame.
+            factor (int): Downscale factor.
+
+        Returns:
+            tuple: Full-resolution (x0, y0, x1, y1) window around the coarse hit, or None.
+        """
+        scale = 1 / factor
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        observation, _ = self.processor.detect(
+            small, self.mask_option, self.min_area * scale * scale, scale
+        )
+        if observation is None:
+            return None
+
+        x, y, w, h = observation.bbox
+        margin = 2 * factor
+        height, width = frame.shape[:2]
+        return (
+            max(x * factor - margin, 0),
+            max(y * factor - margin, 0),
+            min((x + w) * factor + margin, width),
+            min((y + h) * factor + margin, height),
+        )
+
+    def detect_in_window(self, frame, bounds):
+        """
+        Detect the bob inside a window of the frame.
+
+        Args:
+            frame (numpy.ndarray): Input image frame.
+            bounds (tuple): (x0, y0, x1, y1) of the window.
+
+        Returns:
+            tuple: (observation, mask) in frame coordinates, see detect.
+        """
+        x0, y0, x1, y1 = bounds
+        window = frame[y0:y1, x0:x1]
+        observation, window_mask = self.processor.detect(
+            window, self.mask_option, self.min_area
+        )
+        observation = shift_observation(observation, x0, y0)
+        if not self.keep_mask:
+            return observation, None
+
+        if window_mask is None:
+            return observation, self.display_mask(frame, observation, None)
+        mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+        mask[y0:y1, x0:x1] = window_mask
+        return observation, mask
+
+    def display_mask(self, frame, observation, mask):
+        """
+        Mask to show in the "Mask" display, built only when keep_mask is set.
+
+        Args:
+            frame (numpy.ndarray): Input image frame.
+            observation (Observation): Detection of the frame, or None.
+            mask (numpy.ndarray): Mask produced by the detector, or None.
+
+        Returns:
+            numpy.ndarray: Mask of the frame, or None.
+        """
+        if not self.keep_mask:
+            return None
+        if mask is None:
+            return self.processor.observation_mask(frame.shape, observation)
+        return mask
+
+    def calculate_static_params(self):
+        if len(self.data_points) == 0:
+            return
+        x_data = self.data_points.column("x")  # x positions
+        y_data = self.data_points.column("y")  # y positions
+
+        # attempting to fit the values in a circle
+        circle_result = least_squares(
+            circle_residuals, self.initial_circle_guess, args=(x_data, y_data)
+        )
+        self.apply_circle(circle_result.x, self.calculate_mean_point())
+
+    def add_live_point(self, cx, cy, frame_number):
+        """
+        Add a live detection to the running circle fit.
+
+        data_points keeps a uniform reservoir sample of at most
+        calibration_frames detections of the whole session, so the geometric
+        refinement sees the full swing and not only its damped tail.
+        """
+        self.circle_fit.add(cx, cy)
+        if len(self.data_points) < self.calibration_frames:
+            self.data_points.append(cx, cy, frame_number)
+            return
+        index = self._rng.integers(self.circle_fit.n)
+        if index < self.calibration_frames:
+            self.data_points.view()[index] = (cx, cy, frame_number)
+
+    def update_live_params(self):
+        """
+        Refresh the circle of a live source from the running algebraic fit,
+        optionally polished by a few geometric iterations over the reservoir
+        of calibration points. The cost does not grow with the session length.
+        """
+        circle_params = self.circle_fit.solve()
+        if circle_params is None:
+            return
+        if self.live_refine_nfev:
+            circle_params = refine_circle(
+                circle_params,
+                self.data_points.column("x"),
+                self.data_points.column("y"),
+                max_nfev=self.live_refine_nfev,
+            )
+        self.apply_circle(circle_params, self.circle_fit.mean())
+
+    def apply_circle(self, circle_params, mean_point):
+        """
+        Adopt a fitted circle and derive the rotation angle and display params.
+
+        Args:
+            circle_params: Fitted (a, b, r).
+            mean_point (tuple): Mean (x, y) of the points the circle was fitted to.
+        """
+        self.circle_params = circle_params
+        fitted_a, fitted_b, fitted_r = self.circle_params
+        if self.search_window is not None:
+            self.search_window.circle_params = self.circle_params
+
+        self.calculate_rotation_angle(fitted_a, fitted_b, mean_point)
+
+        self.params["mean_point"] = (int(mean_point[0]), int(mean_point[1]))
+        self.params["center"] = (int(fitted_a), int(fitted_b))
+        self.params["length"] = int(fitted_r)
+        if self.on_params:
+            self.on_params(self.params)
+
+    def calculate_rotation_angle(self, fitted_a, fitted_b, mean_point):
+        self.params["angle_rad"] = rotation_angle(fitted_a, fitted_b, mean_point)
+
+    def calculate_mean_point(self):
+        mean_x = np.mean(self.data_points.column("x"))
+        mean_y = np.mean(self.data_points.column("y"))
+        return (mean_x, mean_y)
+
+    def calibration_length(self, max_frames=None):
+        """
+        Number of frames used for the circle fit of a file input.
+
+        Args:
+            max_frames (int): Frames the run will analyse. Default is no limit.
+        """
+        remaining = self.total_frames - self.frame_offset
+        if max_frames is not None:
+            remaining = min(remaining, max_frames * self.sample_step())
+        return max(1, min(remaining, self.calibration_frames))
+
+    def transform(self, cx, cy):
+        """
+        Project bob positions into the rotated pendulum frame.
+
+        Args:
+            cx: X-coordinates of the bob (scalar or array).
+            cy: Y-coordinates of the bob (scalar or array).
+
+        Returns:
+            X-coordinates along the swing.
+        """
+        fitted_a, fitted_b, _ = self.circle_params
+        x_transformed, _ = rotate_opencv_point(
+            cx, cy, fitted_a, fitted_b, self.params["angle_rad"], self.height
+        )
+        return x_transformed
+
+    def finish_calibration(self):
+        """
+        Fit the circle on the calibration detections and transform every
+        detection recorded so far.
+
+        Returns:
+            list: (frame_number, x_transformed) pairs of the replayed detections.
+        """
+        start = self.metrics.clock()
+        self.calculate_static_params()
+        self.metrics.record("calibrate", start)
+        self.data_points.clear()
+        track = self.track.view()
+        if len(self.predicted):
+            track = np.sort(np.concatenate([track, self.predicted.view()]), order="frame")
+        x_transformed = self.transform(track["x"], track["y"])
+        return list(zip(track["frame"].tolist(), x_transformed.tolist()))
+
+    def detect_range(self, start, stop):
+        """
+        Detect the bob on a range of frames without calibrating.
+
+        Args:
+            start (int): First frame, counted from frame_offset.
+            stop (int): Frame after the last one, counted from frame_offset.
+
+        Returns:
+            tuple: (records, radius_bob) with the detections as a TRACK_DTYPE
+            array and the bob radius of the last detection.
+        """
+        records = TrackBuffer(capacity=max(stop - start, 1))
+        radius_bob = 0
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.frame_offset + start)
+
+        for frame_number in range(start, stop):
+            if not self._run_flag:
+                break
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+
+            observation, _ = self.detect(frame, frame_number)
+            if observation is not None:
+                cx, cy = observation.center
+                radius_bob = observation.radius
+                # downscale="auto" and the ROI size follow the measured radius
+                self.params["radius_bob"] = radius_bob
+                if self.search_window is not None:
+                    self.search_window.radius_bob = radius_bob
+                records.append(cx, cy, frame_number)
+
+        return records.view(), radius_bob
+
+    def calibrate_from_track(self, track, radius_bob):
+        """
+        Load a complete track and calibrate on its first frames.
+
+        Args:
+            track (numpy.ndarray): Detections as a TRACK_DTYPE array, in frame order.
+            radius_bob (float): Measured bob radius.
+        """
+        self.track.extend(track)
+        self.data_points.extend(track[track["frame"] < self.calibration_length()])
+        self.params["radius_bob"] = radius_bob
+        self.finish_calibration()
+        self.calibrated = True
+
+    def detector_config(self):
+        """
+        Settings that determine the detections of a run.
+        """
+        config = self.processor.config()
+        config.update(
+            mask_option=self.mask_option,
+            min_area=self.min_area,
+            frame_offset=self.frame_offset,
+            roi=self.search_window is not None,
+            downscale=self.downscale,
+            coarse_bob_radius=self.coarse_bob_radius,
+            detect_interval=self.detect_interval,
+            max_uncertainty=self.max_uncertainty,
+            sample_step=self.sample_step(),
+            calibration_samples=self.calibration_samples,
+        )
+        if self.search_window is not None:
+            # ROI windows follow the circle fitted on the calibration frames
+            config["calibration_frames"] = self.calibration_frames
+        return config
+
+    def cache_key(self, cache, max_frames=None):
+        """
+        DetectionCache key of this run, or None if the run cannot be cached.
+        """
+        if cache is None or self.is_live or not isinstance(self.video_path, str):
+            return None
+        if not os.path.isfile(self.video_path):
+            return None
+        config = self.detector_config()
+        config["max_frames"] = max_frames
+        return cache.key(self.video_path, config)
+
+    def load_cached(self, cache, key):
+        """
+        Calibrate from cached detections instead of processing the video.
+
+        Returns:
+            int: Number of frames the cached run processed, or None on a miss.
+        """
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        track, radius_bob, processed_frames, predicted = entry
+        self.predicted.extend(predicted)
+        self.calibrate_from_track(track, radius_bob)
+        if self.recorder is not None:
+            for cx, cy, frame_number in track.tolist():
+                seconds = frame_number / self.frame_rate if self.frame_rate > 0 else 0.0
+                self.recorder.append(frame_number, seconds, cx, cy)
+        return processed_frames
+
+    def store_cached(self, cache, key, processed_frames, max_frames=None):
+        """
+        Cache the detections of a completed run.
+
+        Runs that were stopped, or whose detector settings changed while
+        running (e.g. HSV sliders), are not stored.
+        """
+        if not self._run_flag or self.cache_key(cache, max_frames) != key:
+            return
+        cache.put(
+            key,
+            self.track.view(),
+            self.params.get("radius_bob", 0),
+            processed_frames,
+            self.predicted.view(),
+        )
+
+    def start(self, max_frames=None):
+        """
+        Rewind the capture to the frame offset and reset the calibration state.
+
+        Args:
+            max_frames (int): Frames the run will analyse, so the calibration
+                window does not reach past them. Default is no limit.
+        """
+        self.calibrated = self.is_live
+        self._calibration_length = self.calibration_length(max_frames)
+        self._last_progress = None
+        if self.predictor is not None:
+            self.predictor.reset()
+        if self.calibration_samples and not self.calibrated:
+            self.calibrate_sampled()
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.frame_offset)
+
+    def sample_step(self):
+        """
+        Source frames per analysed frame for the target sample rate.
+        """
+        if not self.sample_rate or self.frame_rate <= 0:
+            return 1
+        return max(1, int(round(self.frame_rate / self.sample_rate)))
+
+    def calibrate_sampled(self):
+        """
+        Fit the circle on a spread subset of the calibration window.
+
+        Every frame of the window is grabbed to advance the capture, but only
+        the spread_samples picks are retrieved and detected. The picks only
+        calibrate: the capture is then rewound and the analysis starts
+        calibrated from the frame offset, so nothing has to be replayed. If
+        fewer than three picks contain the bob, calibration falls back to the
+        streamed frames.
+        """
+        length = self._calibration_length
+        picks = spread_samples(length, self.calibration_samples)
+        self.data_points.clear()
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.frame_offset)
+
+        next_pick = 0
+        for frame_number in range(picks[-1] + 1):
+            if not self._run_flag or not self.cap.grab():
+                break
+            if frame_number != picks[next_pick]:
+                continue
+            next_pick += 1
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                break
+
+            # picks are too far apart for the ROI and Kalman predictions
+            observation, _ = self.detect_full_frame(frame)
+            if observation is not None:
+                cx, cy = observation.center
+                self.data_points.append(cx, cy, frame_number)
+                self.params["radius_bob"] = observation.radius
+            self.report_progress(int(next_pick / len(picks) * 100))
+
+        if len(self.data_points) >= 3:
+            self.finish_calibration()
+            self.calibrated = True
+        else:
+            self.data_points.clear()
+
+    def report_progress(self, percent):
+        """
+        Pass the calibration progress to on_progress when it changes.
+        """
+        if self.on_progress and percent != self._last_progress:
+            self._last_progress = percent
+            self.on_progress(percent)
+
+    def read_frames(self):
+        """
+        Decode frames until the stream ends or the engine is stopped.
+
+        Yields:
+            tuple: (frame_number, frame), counted from frame_offset.
+        """
+        metrics = self.metrics
+        step = self.sample_step()
+        frame_number = 0
+        while self._run_flag:
+            start = metrics.clock()
+            if not self.cap.grab():
+                break
+            if frame_number % step:
+                # skipped frames are never converted or copied out of the decoder
+                frame_number += 1
+                metrics.count("skipped_frames")
+                continue
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                break
+            metrics.record("decode", start)
+            metrics.mark_captured(frame_number)
+            yield frame_number, frame
+            frame_number += 1
+
+    def process_frame(self, frame_number, frame):
+        """
+        Detect the bob in a frame and update the track and calibration.
+
+        File inputs are calibrated on their first frames as they stream by, so
+        every frame is decoded and detected only once. Detections made before
+        the circle fit is available are transformed when it completes and
+        handed back through the "replayed" entry.
+
+        Args:
+            frame_number (int): Index of the frame, counted from frame_offset.
+            frame (numpy.ndarray): Decoded frame.
+
+        Returns:
+            dict: Per-frame result with the frame number, the unmodified frame,
+            the observation, the mask (if kept), the bob center (or None), its
+            x position in the rotated pendulum frame, whether calibration is
+            done, the replayed (frame_number, x_transformed) pairs and whether
+            the center was measured or predicted by the Kalman filter.
+        """
+        metrics = self.metrics
+        predicted = self.predict(frame_number)
+        if predicted is None:
+            start = metrics.clock()
+            observation, mask = self.detect(frame, frame_number)
+            metrics.record("detect", start)
+        else:
+            observation, mask = None, self.display_mask(frame, None, None)
+        start = metrics.clock()
+        center = None
+        x_transformed = None
+        replayed = []
+
+        if observation is not None:
+            cx, cy = center = observation.center
+            radius_bob = observation.radius
+            if self.search_window is not None:
+                self.search_window.radius_bob = radius_bob
+
+            if not self.calibrated:
+                self.data_points.append(cx, cy, frame_number)
+                self.params["radius_bob"] = radius_bob
+            elif self.is_live:
+                self.add_live_point(cx, cy, frame_number)
+                # counted in detections, so skipped or predicted frames
+                # cannot step over every refit
+                if self.circle_fit.n % self.live_calibration_interval == 0:
+                    self.params["radius_bob"] = radius_bob
+                    self.update_live_params()
+
+            if self.calibrated:
+                x_transformed = self.transform(cx, cy)
+            self.track.append(cx, cy, frame_number)
+            if self.predictor is not None:
+                self.predictor.correct(frame_number, cx, cy)
+                self.interpolate_predicted()
+            if self.recorder is not None:
+                seconds = frame_number / self.frame_rate if self.frame_rate > 0 else 0.0
+                self.recorder.append(frame_number, seconds, cx, cy)
+        elif predicted is not None:
+            cx, cy = center = predicted
+            if self.calibrated:
+                x_transformed = self.transform(cx, cy)
+            self.predicted.append(cx, cy, frame_number)
+            metrics.count("predicted")
+
+        if not self.calibrated:
+            count = frame_number + 1
+            self.report_progress(min(int((count / self._calibration_length) * 100), 100))
+            if count >= self._calibration_length:
+                replayed = self.finish_calibration()
+                self.calibrated = True
+                if center is not None:
+                    x_transformed = replayed[-1][1]
+
+        if observation is None and predicted is None:
+            metrics.count("misses")
+        metrics.record("track", start)
+        return {
+            "frame_number": frame_number,
+            "frame": frame,
+            "observation": observation,
+            "mask": mask,
+            "center": center,
+            "x_transformed": x_transformed,
+            "calibrated": self.calibrated,
+            "replayed": replayed,
+            "measured": predicted is None,
+        }
+
+    def finish(self):
+        """
+        Complete the calibration if the stream ended before the calibration
+        window was filled.
+        """
+        if not self.calibrated:
+            self.finish_calibration()
+            self.calibrated = True
+
+    def frames(self, max_frames=None):
+        """
+        Process the video frame by frame on the calling thread.
+
+        Args:
+            max_frames (int): Frames the caller will consume, see start.
+                Default is no limit.
+
+        Yields:
+            dict: Per-frame result, see process_frame.
+        """
+        self.start(max_frames)
+        for frame_number, frame in self.read_frames():
+            yield self.process_frame(frame_number, frame)
+        self.finish()
+
+    def run(self, max_frames=None, threaded=False, cache=None):
+        """
+        Process the whole video without any display work and fit the track.
+
+        Args:
+            max_frames (int): Stop after this many frames. Default is no limit.
+            threaded (bool): Decode on a separate thread from detection. Default is False.
+            cache (DetectionCache): Reuse and store the detections of video files.
+                Default is None (no cache).
+
+        Returns:
+            dict: Circle parameters, oscillator fit and the recorded track.
+        """
+        key = self.cache_key(cache, max_frames)
+        if key is not None:
+            processed = self.load_cached(cache, key)
+            if processed is not None:
+                self.release()
+                return self.results(processed)
+
+        if threaded:
+            pipeline = FramePipeline(self)
+            results = pipeline.results(max_frames)
+        else:
+            results = self.frames(max_frames)
+
+        processed = 0
+        last_frame = -1
+        for result in results:
+            processed += 1
+            last_frame = result["frame_number"]
+            if max_frames is not None and processed >= max_frames:
+                break
+        if threaded:
+            pipeline.close()
+            # the detection stage may have run ahead of the last consumed frame
+            self.truncate(last_frame)
+        self.finish()
+        self.release()
+        if key is not None:
+            self.store_cached(cache, key, processed, max_frames)
+        return self.results(processed)
+
+    def truncate(self, last_frame):
+        """
+        Drop the detections made after a frame.
+        """
+        for buffer in (self.track, self.predicted):
+            frames = buffer.column("frame")
+            buffer.truncate(np.searchsorted(frames, last_frame, side="right"))
+
+    def results(self, processed_frames=None):
+        """
+        Summarize the current track and fits.
+
+        Args:
+            processed_frames (int): Number of frames that were processed.
+
+        Returns:
+            dict: Circle parameters, oscillator fit, the recorded track and its
+            x positions in the rotated pendulum frame. The oscillator is fitted
+            to the measured centers only; the predicted ones are returned
+            separately.
+        """
+        track = self.track.view()
+        x_transformed = self.transform(track["x"], track["y"])
+        predicted = self.predicted.view()
+        oscillator = None
+        if len(track) > 0 and self.frame_rate > 0:
+            start = self.metrics.clock()
+            try:
+                oscillator = params_to_dict(
+                    fit_oscillator(
+                        track["frame"] / self.frame_rate,
+                        x_transformed,
+                        warm_start=self.warm_start,
+                    )
+                )
+            except (RuntimeError, ValueError, TypeError) as e:
+                # stdout carries the CLI JSON and the batch CSV
+                print(e, file=sys.stderr)
+            self.metrics.record("fit", start)
+
+        return {
+            "processed_frames": processed_frames,
+            "detections": len(track),
+            "frame_rate": self.frame_rate,
+            "circle_params": [float(value) for value in self.circle_params],
+            "params": self.params,
+            "oscillator": oscillator,
+            "track": track,
+            "x_transformed": x_transformed,
+            "predicted": predicted,
+            "x_predicted": self.transform(predicted["x"], predicted["y"]),
+        }
+
+    def stop(self):
+        self._run_flag = False
+
+    def release(self):
+        self.cap.release()
@@ -0,0 +1,83 @@
+import numpy as np
+from processing.fitting import fit_oscillator
+from utils.metrics import NO_METRICS
+from utils.utils import underdamped_harmonic_oscillator
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class FitCancelled(Exception):
+    pass
+
+
+class FitWorker(QThread):
+    """
+    Fits the underdamped oscillator model off the GUI thread.
+
+    The worker fits a snapshot of the data, reports progress as the share of
+    the evaluation budget used, and can be cancelled between evaluations.
+    """
+
+    fitted_signal = pyqtSignal(np.ndarray, np.ndarray)
+    progress_signal = pyqtSignal(int)
+    failed_signal = pyqtSignal(str)
+    cancelled_signal = pyqtSignal()
+
+    # evaluations between progress reports
+    progress_interval = 25
+
+    def __init__(
+        self, x_data, y_data, p0=None, maxfev=2500, warm_start=None, metrics=None
+    ):
+        """
+        Initialize the FitWorker.
+
+        Args:
+            x_data: Time (or frame) values, copied on construction.
+            y_data: Position values, copied on construction.
+            p0: Initial guess for (A, gamma, w, phi, C). Default is estimated from the data.
+            maxfev (int): Maximum number of function evaluations. Default is 2500.
+            warm_start (dict): Previous fit of the same rig, used when p0 is None.
+            metrics (Metrics): Records the fit duration. Default is none.
+        """
+        super().__init__()
+        self.x_data = np.array(x_data, dtype=float)
+        self.y_data = np.array(y_data, dtype=float)
+        self.p0 = p0
+        self.maxfev = maxfev
+        self.warm_start = warm_start
+        self.metrics = metrics or NO_METRICS
+        self._cancelled = False
+        self._evaluations = 0
+
+    def cancel(self):
+        self._cancelled = True
+
+    def model(self, t, *params):
+        if self._cancelled:
+            raise FitCancelled()
+        self._evaluations += 1
+        if self._evaluations % self.progress_interval == 0:
+            self.progress_signal.emit(min(99, int(100 * self._evaluations / self.maxfev)))
+        return underdamped_harmonic_oscillator(t, *params)
+
+    def run(self):
+        start = self.metrics.clock()
+        try:
+            params = fit_oscillator(
+                self.x_data,
+                self.y_data,
+                p0=self.p0,
+                maxfev=self.maxfev,
+                model=self.model,
+                warm_start=self.warm_start,
+            )
+        except FitCancelled:
+            self.cancelled_signal.emit()
+            return
+        except (RuntimeError, ValueError) as e:
+            self.failed_signal.emit(str(e))
+            return
+
+        self.metrics.record("fit", start)
+        self.progress_signal.emit(100)
+        self.fitted_signal.emit(params, self.x_data)
@@ -0,0 +1,308 @@
+import os
+import numpy as np
+from scipy.optimize import curve_fit, least_squares
+from utils.utils import (
+    underdamped_harmonic_oscillator,
+    circle_residuals,
+    load_json,
+    get_project_root,
+)
+from utils.contansts import lower_bounds, upper_bounds
+
+project_root = get_project_root(os.path.dirname(os.path.abspath(__file__)))
+data_folder = os.path.join(project_root, "data")
+
+PARAM_NAMES = ("A", "gamma", "w", "phi", "C")
+
+
+# Analytic Jacobian of the underdamped harmonic oscillator model
+def oscillator_jacobian(t, A, gamma, w, phi, C):
+    """
+    Partial derivatives of underdamped_harmonic_oscillator.
+
+    Args:
+        t: Time values.
+        A, gamma, w, phi, C: Model parameters.
+
+    Returns:
+        numpy.ndarray: (len(t), 5) matrix of d/dA, d/dgamma, d/dw, d/dphi, d/dC.
+    """
+    t = np.asarray(t, dtype=float)
+    decay = np.exp(-gamma * t)
+    angle = w * t + phi
+    cos_term = decay * np.cos(angle)
+    sin_term = A * decay * np.sin(angle)
+    return np.column_stack(
+        (cos_term, -A * t * cos_term, -t * sin_term, -sin_term, np.ones_like(t))
+    )
+
+
+def estimate_frequency(t, y):
+    """
+    Angular frequency of the spectral peak of a zero-mean signal.
+
+    The samples are interpolated onto a uniform grid (tracks have gaps where
+    the bob was missed) and the peak bin is refined by parabolic interpolation.
+    """
+    dt = np.median(np.diff(t))
+    if not dt > 0:
+        return 0.0
+    grid = np.arange(t[0], t[-1], dt)
+    if len(grid) < 4:
+        return 0.0
+
+    samples = np.interp(grid, t, y) * np.hanning(len(grid))
+    size = 1 << int(np.ceil(np.log2(len(grid) * 4)))
+    spectrum = np.abs(np.fft.rfft(samples, size))
+    spectrum[0] = 0
+    k = int(np.argmax(spectrum))
+
+    offset = 0.0
+    if 0 < k < len(spectrum) - 1:
+        left, center, right = np.log(spectrum[k - 1 : k + 2] + 1e-12)
+        denominator = left - 2 * center + right
+        if denominator != 0:
+            offset = 0.5 * (left - right) / denominator
+    return 2 * np.pi * (k + offset) / (size * dt)
+
+
+def estimate_damping(t, y, w):
+    """
+    Damping coefficient from the decay of the per-period peaks of |y|.
+    """
+    if w <= 0:
+        return 0.0
+    period = 2 * np.pi / w
+    bins = ((t - t[0]) // period).astype(int)
+    peak_times = []
+    peaks = []
+    for index in np.unique(bins):
+        in_bin = np.flatnonzero(bins == index)
+        if len(in_bin) < 2:
+            continue
+        best = in_bin[np.argmax(np.abs(y[in_bin]))]
+        if y[best] != 0:
+            peak_times.append(t[best])
+            peaks.append(abs(y[best]))
+
+    if len(peaks) < 2:
+        return 0.0
+    slope, _ = np.polyfit(peak_times, np.log(peaks), 1)
+    return max(-slope, 0.0)
+
+
+def estimate_amplitude_phase(t, y, w, gamma):
+    """
+    Amplitude and phase by linear least squares with w and gamma held fixed.
+    """
+    decay = np.exp(-gamma * t)
+    design = np.column_stack((decay * np.cos(w * t), decay * np.sin(w * t)))
+    (p, q), *_ = np.linalg.lstsq(design, y, rcond=None)
+    return np.hypot(p, q), np.arctan2(-q, p)
+
+
+def estimate_initial_guess(t, x, warm_start=None, tolerance=0.2):
+    """
+    Starting point for the oscillator fit derived from the data.
+
+    C is the mean, w the spectral peak, gamma the decay of the per-period
+    peaks, and A and phi a linear fit with w and gamma fixed. If warm_start
+    holds a previous fit of the same rig, i.e. its w is within `tolerance`
+    of the estimate, its w and gamma are used instead and A and phi are
+    recomputed for this recording.
+
+    Args:
+        t: Time (or frame) values.
+        x: Position values.
+        warm_start (dict): Previous fit in the parameters.json layout. Default is None.
+        tolerance (float): Relative frequency difference accepted for a warm start.
+
+    Returns:
+        numpy.ndarray: Initial (A, gamma, w, phi, C).
+    """
+    t = np.asarray(t, dtype=float)
+    x = np.asarray(x, dtype=float)
+    C = float(np.mean(x))
+    y = x - C
+
+    w = estimate_frequency(t, y)
+    gamma = estimate_damping(t, y, w)
+    if warm_start and w > 0 and abs(warm_start["w"] - w) <= tolerance * w:
+        w = warm_start["w"]
+        gamma = max(warm_start["gamma"], 0.0)
+
+    A, phi = estimate_amplitude_phase(t, y, w, gamma)
+    return np.array([A, gamma, w, phi, C])
+
+
+def load_saved_params(filename=None):
+    """
+    Load the last saved oscillator fit, or None if there is none.
+    """
+    if filename is None:
+        filename = os.path.join(data_folder, "json", "parameters.json")
+    if not os.path.exists(filename):
+        return None
+    params = load_json(filename)
+    if not params or any(name not in params for name in PARAM_NAMES):
+        return None
+    return params
+
+
+# Function to fit the underdamped harmonic oscillator model to a track
+def fit_oscillator(
+    t,
+    x,
+    p0=None,
+    maxfev=2500,
+    ftol=1e-6,
+    model=underdamped_harmonic_oscillator,
+    warm_start=None,
+):
+    """
+    Fit the underdamped harmonic oscillator model to position data.
+
+    Args:
+        t: Time (or frame) values.
+        x: Position values.
+        p0: Initial guess for (A, gamma, w, phi, C). Default is estimated from the data.
+        maxfev: Maximum number of function evaluations.
+        ftol: Relative tolerance on the cost function.
+        model: Model function, e.g. a wrapper around underdamped_harmonic_oscillator
+            that reports progress.
+        warm_start (dict): Previous fit used by estimate_initial_guess when p0 is None.
+
+    Returns:
+        numpy.ndarray: Fitted parameters (A, gamma, w, phi, C).
+    """
+    if p0 is None:
+        p0 = estimate_initial_guess(t, x, warm_start)
+    params, _ = curve_fit(
+        model,
+        t,
+        x,
+        p0=p0,
+        jac=oscillator_jacobian,
+        bounds=(lower_bounds, upper_bounds),
+        maxfev=maxfev,
+        ftol=ftol,
+    )
+    return params
+
+
+def params_to_dict(params):
+    """
+    Convert fitted oscillator parameters to the parameters.json layout.
+    """
+    return {name: float(value) for name, value in zip(PARAM_NAMES, params)}
+
+
+class IncrementalCircleFit:
+    """
+    Algebraic (Kasa) circle fit kept as running sums.
+
+    Adding a point is O(1) and solving is a 3x3 linear system, independent of
+    how many points were seen. Coordinates are taken relative to the first
+    point to keep the sums well conditioned.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.origin = None
+        self._sums = np.zeros(9)
+
+    def add(self, x, y):
+        """
+        Add one point to the running sums.
+        """
+        if self.origin is None:
+            self.origin = (float(x), float(y))
+        u = x - self.origin[0]
+        v = y - self.origin[1]
+        z = u * u + v * v
+        self._sums += (u, v, u * u, v * v, u * v, u * z, v * z, z, 1.0)
+        self.n += 1
+
+    def extend(self, x, y):
+        """
+        Add several points to the running sums at once.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(x) == 0:
+            return
+        if self.origin is None:
+            self.origin = (float(x[0]), float(y[0]))
+        u = x - self.origin[0]
+        v = y - self.origin[1]
+        z = u * u + v * v
+        self._sums += (
+            u.sum(),
+            v.sum(),
+            (u * u).sum(),
+            (v * v).sum(),
+            (u * v).sum(),
+            (u * z).sum(),
+            (v * z).sum(),
+            z.sum(),
+            len(x),
+        )
+        self.n += len(x)
+
+    def mean(self):
+        """
+        Mean of the points added so far, or None without points.
+        """
+        if self.n == 0:
+            return None
+        su, sv = self._sums[:2]
+        return self.origin[0] + su / self.n, self.origin[1] + sv / self.n
+
+    def solve(self):
+        """
+        Solve for the circle through the points added so far.
+
+        Returns:
+            numpy.ndarray: (a, b, r) of the fitted circle, or None if the
+            points do not determine a circle yet.
+        """
+        if self.n < 3:
+            return None
+
+        su, sv, suu, svv, suv, suz, svz, sz, n = self._sums
+        lhs = np.array([[suu, suv, su], [suv, svv, sv], [su, sv, n]])
+        rhs = -np.array([suz, svz, sz])
+        try:
+            d, e, f = np.linalg.solve(lhs, rhs)
+        except np.linalg.LinAlgError:
+            return None
+
+        a = -d / 2
+        b = -e / 2
+        r_squared = a * a + b * b - f
+        if r_squared <= 0:
+            return None
+        return np.array([a + self.origin[0], b + self.origin[1], np.sqrt(r_squared)])
+
+
+# Function to refine a circle with a few geometric least squares iterations
+def refine_circle(circle_params, x, y, max_nfev=5):
+    """
+    Refine a circle estimate by minimizing the geometric distance.
+
+    Args:
+        circle_params: Starting (a, b, r), e.g. from the algebraic fit.
+        x: x-coordinates of data points.
+        y: y-coordinates of data points.
+        max_nfev: Maximum number of function evaluations. Default is 5.
+
+    Returns:
+        numpy.ndarray: Refined (a, b, r).
+    """
+    result = least_squares(
+        circle_residuals, circle_params, args=(x, y), max_nfev=max_nfev
+    )
+    return result.x
@@ -0,0 +1,140 @@
+import numpy as np
+
+
+class KalmanTracker:
+    """
+    Constant-acceleration Kalman filter of the bob position, in pixels and frames.
+
+    x and y are filtered independently with the same model, and both axes are
+    measured together, so they share one 3x3 covariance over
+    (position, velocity, acceleration) and the state is a 3x2 matrix with one
+    column per axis. The process noise is a white-noise jerk, which keeps the
+    filter honest about the curvature of a swing: its position uncertainty
+    grows with the cube of the frames since the last measurement.
+
+    Between two measurements the filter can only extrapolate forward; once
+    the later measurement is in, interpolate() bridges the gap with a cubic
+    Hermite curve through the filtered positions and velocities at both ends.
+    """
+
+    def __init__(self, process_noise=1e-3, measurement_noise=1.0):
+        """
+        Initialize the KalmanTracker.
+
+        Args:
+            process_noise (float): Spectral density of the jerk in px^2/frame^5.
+                Default is 1e-3.
+            measurement_noise (float): Variance of a detected center in px^2. Default is 1.
+        """
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.reset()
+
+    def reset(self):
+        self.state = None
+        self.covariance = None
+        self.frame = None
+        self.last_measured = None
+        self.measurements = 0
+        # (frame, position, velocity) after the latest and the previous correction
+        self.anchor = None
+        self.previous_anchor = None
+
+    @property
+    def ready(self):
+        # position, velocity and acceleration are observable after three detections
+        return self.measurements >= 3
+
+    @staticmethod
+    def transition(dt):
+        return np.array([[1.0, dt, dt * dt / 2], [0.0, 1.0, dt], [0.0, 0.0, 1.0]])
+
+    def noise(self, dt):
+        return self.process_noise * np.array(
+            [
+                [dt**5 / 20, dt**4 / 8, dt**3 / 6],
+                [dt**4 / 8, dt**3 / 3, dt**2 / 2],
+                [dt**3 / 6, dt**2 / 2, dt],
+            ]
+        )
+
+    def predict(self, frame_number):
+        """
+        Advance the filter to a frame.
+
+        Args:
+            frame_number (int): Frame to predict; frames already reached are a no-op.
+
+        Returns:
+            tuple: Predicted (x, y), or None before the first measurement.
+        """
+        if self.state is None:
+            return None
+        dt = frame_number - self.frame
+        if dt > 0:
+            transition = self.transition(dt)
+            self.state = transition @ self.state
+            self.covariance = transition @ self.covariance @ transition.T + self.noise(dt)
+            self.frame = frame_number
+        return float(self.state[0, 0]), float(self.state[0, 1])
+
+    def position_std(self):
+        """
+        Standard deviation of the predicted position per axis in pixels.
+        """
+        if self.covariance is None:
+            return np.inf
+        return float(np.sqrt(self.covariance[0, 0]))
+
+    def correct(self, frame_number, x, y):
+        """
+        Update the filter with a detected center.
+
+        Args:
+            frame_number (int): Frame of the detection.
+            x (float): Detected x.
+            y (float): Detected y.
+        """
+        self.last_measured = frame_number
+        self.measurements += 1
+        if self.state is None:
+            self.state = np.array([[x, y], [0.0, 0.0], [0.0, 0.0]], dtype=float)
+            # unknown velocity and acceleration
+            self.covariance = np.diag([self.measurement_noise, 1e4, 1e2])
+            self.frame = frame_number
+            self.anchor = (frame_number, self.state[0].copy(), self.state[1].copy())
+            return
+
+        self.predict(frame_number)
+        # the measurement picks the position row, so H P H' is P[0, 0]
+        gain = self.covariance[:, 0] / (self.covariance[0, 0] + self.measurement_noise)
+        innovation = np.array([x, y]) - self.state[0]
+        self.state += np.outer(gain, innovation)
+        self.covariance -= np.outer(gain, self.covariance[0])
+        self.previous_anchor = self.anchor
+        self.anchor = (frame_number, self.state[0].copy(), self.state[1].copy())
+
+    def interpolate(self, frames):
+        """
+        Positions between the two latest corrections.
+
+        Args:
+            frames (numpy.ndarray): Frame numbers between the two corrections.
+
+        Returns:
+            numpy.ndarray: (x, y) per frame, or None before the second correction.
+        """
+        if self.previous_anchor is None:
+            return None
+        start, p0, v0 = self.previous_anchor
+        stop, p1, v1 = self.anchor
+        span = max(stop - start, 1)
+        s = ((np.asarray(frames, dtype=float) - start) / span)[:, None]
+        s2 = s * s
+        s3 = s2 * s
+        return (
+            (2 * s3 - 3 * s2 + 1) * p0
+            + (s3 - 2 * s2 + s) * span * v0
+            + (3 * s2 - 2 * s3) * p1
+            + (s3 - s2) * span * v1
+        )
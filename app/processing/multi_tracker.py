@@ -0,0 +1,297 @@
+import sys
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from processing.engine import TrackingEngine, rotation_angle
+from processing.fitting import (
+    fit_oscillator,
+    params_to_dict,
+    IncrementalCircleFit,
+    refine_circle,
+)
+from utils.track_buffer import TrackBuffer
+from utils.utils import rotate_opencv_point
+
+
+class MultiBobTracker:
+    """
+    Follows a fixed number of bobs through per-frame detections.
+
+    Every frame, each track predicts its position at constant velocity and
+    the detections are matched to the predictions with the Hungarian
+    algorithm on the full track x detection distance matrix. Matches farther
+    than the gate are rejected; the gate widens with every missed frame, and a
+    track missed for more than max_misses frames in a row goes back to idle
+    rather than claiming ever more distant detections. Idle tracks are
+    started from unmatched detections, left to right, so the bob numbering
+    follows the layout of the rig.
+    """
+
+    def __init__(self, count, max_distance=60.0, max_misses=5):
+        """
+        Initialize the MultiBobTracker.
+
+        Args:
+            count (int): Number of bobs.
+            max_distance (float): Largest distance in pixels between a prediction
+                and the detection matched to it. Default is 60.
+            max_misses (int): Missed frames in a row before a track is dropped
+                and restarted from an unused detection. Default is 5.
+        """
+        self.count = count
+        self.max_distance = max_distance
+        self.max_misses = max_misses
+        self.tracks = [TrackBuffer() for _ in range(count)]
+        self.radius = np.zeros(count)
+        self.reset()
+
+    def reset(self):
+        # (frame, x, y) of the last two detections of every track
+        self.last = np.full((self.count, 3), np.nan)
+        self.previous = np.full((self.count, 3), np.nan)
+        self.misses = np.zeros(self.count, dtype=int)
+        for track in self.tracks:
+            track.clear()
+
+    @property
+    def active(self):
+        return ~np.isnan(self.last[:, 0])
+
+    def predict(self, frame_number):
+        """
+        Predicted (x, y) of every track at a frame; NaN for idle tracks.
+        """
+        steps = frame_number - self.last[:, 0]
+        dt = np.maximum(self.last[:, 0] - self.previous[:, 0], 1)
+        velocity = (self.last[:, 1:] - self.previous[:, 1:]) / dt[:, None]
+        velocity = np.nan_to_num(velocity)
+        return self.last[:, 1:] + velocity * steps[:, None]
+
+    def update(self, frame_number, observations):
+        """
+        Assign the detections of a frame to the tracks.
+
+        Args:
+            frame_number (int): Frame the detections were made in.
+            observations (list): Observations of the frame.
+
+        Returns:
+            numpy.ndarray: Index into observations for every track, -1 where the
+            track got no detection.
+        """
+        assigned = np.full(self.count, -1)
+        centers = np.array([o.center for o in observations], dtype=float).reshape(-1, 2)
+        active = np.flatnonzero(self.active)
+
+        if len(active) and len(centers):
+            predicted = self.predict(frame_number)[active]
+            cost = np.hypot(
+                predicted[:, None, 0] - centers[None, :, 0],
+                predicted[:, None, 1] - centers[None, :, 1],
+            )
+            rows, cols = linear_sum_assignment(cost)
+            gate = self.max_distance * (1 + self.misses[active[rows]])
+            accepted = cost[rows, cols] <= gate
+            assigned[active[rows[accepted]]] = cols[accepted]
+
+        idle = np.flatnonzero(~self.active)
+        if len(idle):
+            unused = np.setdiff1d(np.arange(len(centers)), assigned)
+            unused = unused[np.argsort(centers[unused, 0])]
+            for track, detection in zip(idle, unused):
+                assigned[track] = detection
+
+        for track, detection in enumerate(assigned):
+            if detection < 0:
+                self.misses[track] += 1
+                if self.misses[track] > self.max_misses:
+                    self.last[track] = np.nan
+                    self.previous[track] = np.nan
+                    self.misses[track] = 0
+                continue
+            cx, cy = observations[detection].center
+            self.previous[track] = self.last[track]
+            self.last[track] = (frame_number, cx, cy)
+            self.misses[track] = 0
+            self.radius[track] = observations[detection].radius
+            self.tracks[track].append(cx, cy, frame_number)
+        return assigned
+
+
+# Function to run the circle and oscillator fits on one bob's track
+def fit_bob(track, frame_rate, height, calibration_frames=2000, warm_start=None):
+    """
+    Fit the pendulum circle and the oscillator to the track of one bob.
+
+    The circle is solved algebraically and then refined geometrically on the
+    detections of the first calibration_frames frames, as TrackingEngine does
+    for a single bob.
+
+    Args:
+        track (numpy.ndarray): Detections as a TRACK_DTYPE array.
+        frame_rate (float): Frames per second of the video.
+        height (float): Frame height, for the rotated coordinates.
+        calibration_frames (int): Frames used for the circle fit. Default is 2000.
+        warm_start (dict): Previous oscillator fit to start from.
+
+    Returns:
+        dict: Detections, circle_params, params (as TrackingEngine.params),
+        oscillator, and the track with its x_transformed positions.
+    """
+    result = {
+        "detections": len(track),
+        "circle_params": None,
+        "params": {},
+        "oscillator": None,
+        "track": track,
+        "x_transformed": np.empty(0),
+    }
+    window = track[track["frame"] < calibration_frames]
+    if len(window) < 3:
+        window = track
+
+    circle_fit = IncrementalCircleFit()
+    circle_fit.extend(window["x"], window["y"])
+    circle_params = circle_fit.solve()
+    if circle_params is None:
+        return result
+    circle_params = refine_circle(circle_params, window["x"], window["y"], max_nfev=50)
+
+    a, b, r = circle_params
+    mean_point = circle_fit.mean()
+    angle = rotation_angle(a, b, mean_point)
+    x_transformed, _ = rotate_opencv_point(track["x"], track["y"], a, b, angle, height)
+    result.update(
+        circle_params=[float(value) for value in circle_params],
+        params={
+            "angle_rad": float(angle),
+            "mean_point": (int(mean_point[0]), int(mean_point[1])),
+            "center": (int(a), int(b)),
+            "length": int(r),
+        },
+        x_transformed=x_transformed,
+    )
+
+    if frame_rate > 0 and len(track) >= 5:
+        try:
+            result["oscillator"] = params_to_dict(
+                fit_oscillator(track["frame"] / frame_rate, x_transformed, warm_start=warm_start)
+            )
+        except (RuntimeError, ValueError, TypeError) as e:
+            print(e, file=sys.stderr)
+    return result
+
+
+class MultiBobEngine:
+    """
+    Tracks several bobs in one video with a single detection pass per frame.
+
+    Capture, HSV thresholds and detector settings come from a TrackingEngine;
+    every frame is masked once and all blobs go to a MultiBobTracker.
+    """
+
+    def __init__(
+        self,
+        video_path,
+        count,
+        mask_option="Color Detection",
+        hsv_vals=None,
+        max_distance=60.0,
+        metrics=None,
+    ):
+        """
+        Initialize the MultiBobEngine.
+
+        Args:
+            video_path (str | int): Path or URL of a video, or a camera index.
+            count (int): Number of bobs.
+            mask_option (str): Detection mode.
+            hsv_vals (dict): HSV thresholds. Defaults to the values in data/json/hsv.json.
+            max_distance (float): Association gate in pixels. Default is 60.
+            metrics (Metrics): Collects per-stage timings and counters. Default is none.
+        """
+        self.engine = TrackingEngine(
+            video_path, mask_option, hsv_vals=hsv_vals, metrics=metrics
+        )
+        self.tracker = MultiBobTracker(count, max_distance)
+        self.warm_start = None
+
+    def process_frame(self, frame_number, frame):
+        """
+        Detect all bobs in a frame and extend their tracks.
+
+        Returns:
+            dict: Frame number, frame, observations, mask and the observation
+            index assigned to every bob (-1 if none).
+        """
+        engine = self.engine
+        start = engine.metrics.clock()
+        observations, mask = engine.processor.detect_all(
+            frame, engine.mask_option, engine.min_area
+        )
+        engine.metrics.record("detect", start)
+
+        start = engine.metrics.clock()
+        assigned = self.tracker.update(frame_number, observations)
+        engine.metrics.record("associate", start)
+        engine.metrics.count("misses", int((assigned < 0).sum()))
+        return {
+            "frame_number": frame_number,
+            "frame": frame,
+            "observations": observations,
+            "mask": mask,
+            "assigned": assigned,
+        }
+
+    def run(self, max_frames=None):
+        """
+        Process the video and fit every bob.
+
+        Args:
+            max_frames (int): Stop after this many frames. Default is no limit.
+
+        Returns:
+            dict: See results.
+        """
+        self.engine.start()
+        self.tracker.reset()
+        processed = 0
+        for frame_number, frame in self.engine.read_frames():
+            self.process_frame(frame_number, frame)
+            processed += 1
+            if max_frames is not None and processed >= max_frames:
+                break
+        self.engine.release()
+        return self.results(processed)
+
+    def results(self, processed_frames=None):
+        """
+        Fit every bob's track.
+
+        Returns:
+            dict: processed_frames, frame_rate and a "bobs" list with one
+            fit_bob result per bob, numbered left to right.
+        """
+        engine = self.engine
+        start = engine.metrics.clock()
+        bobs = [
+            fit_bob(
+                track.view(),
+                engine.frame_rate,
+                engine.height,
+                engine.calibration_frames,
+                self.warm_start,
+            )
+            for track in self.tracker.tracks
+        ]
+        engine.metrics.record("fit", start)
+        return {
+            "processed_frames": processed_frames,
+            "frame_rate": engine.frame_rate,
+            "bobs": bobs,
+        }
+
+    def stop(self):
+        self.engine.stop()
+
+    def release(self):
+        self.engine.release()
@@ -0,0 +1,187 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from processing.detection_cache import DetectionCache
+from processing.engine import TrackingEngine
+from utils.track_buffer import TRACK_DTYPE
+
+
+def _detect_chunk(task):
+    video_path, mask_option, hsv_vals, roi, downscale, start, stop = task
+    engine = TrackingEngine(
+        video_path, mask_option, hsv_vals=hsv_vals, roi=roi, downscale=downscale
+    )
+    try:
+        return engine.detect_range(start, stop)
+    finally:
+        engine.release()
+
+
+def split_frames(total, chunks):
+    """
+    Split [0, total) into at most `chunks` contiguous (start, stop) ranges.
+    """
+    chunks = max(1, min(chunks, total))
+    edges = np.linspace(0, total, chunks + 1).astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:])]
+
+
+def process_parallel(
+    video_path,
+    mask_option="Color Detection",
+    hsv_vals=None,
+    workers=None,
+    chunks=None,
+    roi=False,
+    warm_start=None,
+    max_frames=None,
+    downscale=1,
+):
+    """
+    Detect the bob over a video file in parallel frame ranges, then calibrate
+    and fit once on the merged track.
+
+    Every worker process opens its own capture and seeks to the start of its
+    range, so the frame indices of the partial tracks are exact.
+
+    Args:
+        video_path (str): Path of the video file.
+        mask_option (str): Detection mode.
+        hsv_vals (dict): HSV thresholds. Defaults to the values in data/json/hsv.json.
+        workers (int): Number of worker processes. Default is the CPU count.
+        chunks (int): Number of frame ranges. Default is the number of workers.
+        roi (bool): Use ROI-restricted detection inside each range.
+        warm_start (dict): Previous oscillator fit to start the final fit from.
+        max_frames (int): Process only this many frames. Default is no limit.
+        downscale (int | str): Coarse detection factor, see TrackingEngine.
+
+    Returns:
+        dict: Same layout as TrackingEngine.results().
+    """
+    engine = TrackingEngine(video_path, mask_option, hsv_vals=hsv_vals, roi=roi)
+    engine.release()
+    engine.warm_start = warm_start
+    if engine.is_live:
+        raise ValueError("parallel processing needs a video file with a known frame count")
+
+    workers = workers or os.cpu_count() or 1
+    total = max(engine.total_frames - engine.frame_offset, 0)
+    if max_frames is not None:
+        total = min(total, max_frames)
+    tasks = [
+        (video_path, mask_option, engine.hsv_vals, roi, downscale, start, stop)
+        for start, stop in split_frames(total, chunks or workers)
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_detect_chunk, tasks))
+
+    track = np.concatenate([records for records, _ in parts] or [np.empty(0, TRACK_DTYPE)])
+    radius_bob = next((radius for _, radius in parts if radius), 0)
+    engine.calibrate_from_track(track, radius_bob)
+    return engine.results(total)
+
+
+# columns of the batch summary table
+SUMMARY_FIELDS = (
+    "video",
+    "A",
+    "gamma",
+    "w",
+    "phi",
+    "C",
+    "pivot_x",
+    "pivot_y",
+    "length",
+    "angle_rad",
+    "detection_rate",
+    "wall_time",
+    "error",
+)
+
+
+def summarize(video_path, results, wall_time):
+    """
+    One summary table row from the results of a TrackingEngine run.
+    """
+    pivot_x, pivot_y, length = results["circle_params"]
+    processed = results["processed_frames"] or 0
+    row = dict.fromkeys(SUMMARY_FIELDS)
+    row.update(results["oscillator"] or {})
+    row.update(
+        video=video_path,
+        pivot_x=pivot_x,
+        pivot_y=pivot_y,
+        length=abs(length),
+        angle_rad=float(results["params"]["angle_rad"]),
+        detection_rate=results["detections"] / processed if processed else 0.0,
+        wall_time=wall_time,
+    )
+    return row
+
+
+def _process_video(task):
+    video_path, mask_option, hsv_vals, roi, downscale, warm_start, cache = task
+    start = time.perf_counter()
+    try:
+        engine = TrackingEngine(
+            video_path, mask_option, hsv_vals=hsv_vals, roi=roi, downscale=downscale
+        )
+        if engine.is_live:
+            engine.release()
+            raise ValueError("not a video file with a known frame count")
+        engine.warm_start = warm_start
+        results = engine.run(cache=DetectionCache() if cache else None)
+    except Exception as e:
+        # one bad recording must not abort the whole batch
+        row = dict.fromkeys(SUMMARY_FIELDS)
+        row.update(video=video_path, wall_time=time.perf_counter() - start, error=str(e))
+        return row
+    return summarize(video_path, results, time.perf_counter() - start)
+
+
+def process_batch(
+    video_paths,
+    mask_option="Color Detection",
+    hsv_vals=None,
+    workers=None,
+    roi=False,
+    downscale=1,
+    warm_start=None,
+    cache=False,
+    on_row=None,
+):
+    """
+    Track and fit several video files, one video per worker process.
+
+    Args:
+        video_paths (list): Paths of the video files.
+        mask_option (str): Detection mode.
+        hsv_vals (dict): HSV thresholds. Defaults to the values in data/json/hsv.json.
+        workers (int): Number of worker processes. Default is the CPU count.
+        roi (bool): Use ROI-restricted detection.
+        downscale: Coarse detection factor, or "auto".
+        warm_start (dict): Previous oscillator fit to start each fit from.
+        cache (bool): Reuse and store detections in the DetectionCache.
+        on_row (callable): Called with each summary row as its video finishes.
+
+    Returns:
+        list: Summary rows (dicts keyed by SUMMARY_FIELDS) in the order of video_paths.
+    """
+    workers = workers or os.cpu_count() or 1
+    rows = [None] * len(video_paths)
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(video_paths), 1))) as pool:
+        futures = {
+            pool.submit(
+                _process_video,
+                (path, mask_option, hsv_vals, roi, downscale, warm_start, cache),
+            ): index
+            for index, path in enumerate(video_paths)
+        }
+        for future in as_completed(futures):
+            row = future.result()
+            rows[futures[future]] = row
+            if on_row:
+                on_row(row)
+    return rows
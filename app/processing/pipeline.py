@@ -0,0 +1,154 @@
+import queue
+import threading
+
+# queue policies for the capture stage
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+LATEST = "latest"
+
+
+class FramePipeline:
+    """
+    Staged decode -> detect pipeline around a TrackingEngine.
+
+    A capture thread decodes frames into a bounded queue, a detection thread
+    runs TrackingEngine.process_frame on them, and the consumer iterating
+    results() is the render stage. OpenCV releases the GIL while decoding and
+    masking, so the stages overlap.
+
+    The capture queue policy decides what happens when detection falls behind:
+    BLOCK waits (lossless, the default for files), DROP_OLDEST discards the
+    oldest queued frame (the default for live sources) and LATEST keeps only
+    the newest frame. Frame numbers are assigned at capture, so dropped
+    frames leave gaps in the track rather than shifting it.
+    """
+
+    def __init__(self, engine, queue_size=4, policy=None):
+        """
+        Initialize the FramePipeline.
+
+        Args:
+            engine (TrackingEngine): Engine that owns the capture and detection state.
+            queue_size (int): Capacity of each stage queue. Default is 4.
+            policy (str): BLOCK, DROP_OLDEST or LATEST. Default depends on the source.
+        """
+        if policy is None:
+            policy = DROP_OLDEST if engine.is_live else BLOCK
+        if policy not in (BLOCK, DROP_OLDEST, LATEST):
+            raise ValueError(f"Unknown queue policy: {policy}")
+
+        self.engine = engine
+        self.policy = policy
+        self.dropped_frames = 0
+        self._stopped = threading.Event()
+        self._frames = queue.Queue(maxsize=1 if policy == LATEST else queue_size)
+        self._results = queue.Queue(maxsize=queue_size)
+        self._threads = []
+
+    def _put(self, q, item, lossless):
+        if lossless:
+            while not self._stopped.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            return
+
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    self.dropped_frames += 1
+                    self.engine.metrics.count("dropped_frames")
+                except queue.Empty:
+                    pass
+
+    def _finish(self, q):
+        # end-of-stream markers must get through even after stop()
+        while True:
+            try:
+                q.put(None, timeout=0.1)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _capture(self):
+        try:
+            for item in self.engine.read_frames():
+                if self._stopped.is_set():
+                    break
+                self._put(self._frames, item, lossless=self.policy == BLOCK)
+        finally:
+            self._finish(self._frames)
+
+    def _detect(self):
+        try:
+            while True:
+                item = self._frames.get()
+                if item is None:
+                    break
+                if self._stopped.is_set():
+                    continue
+                self._put(self._results, self.engine.process_frame(*item), lossless=True)
+            self.engine.finish()
+        finally:
+            self._finish(self._results)
+
+    def results(self, max_frames=None):
+        """
+        Start the capture and detection threads and iterate over their results.
+
+        Args:
+            max_frames (int): Frames the caller will consume, see
+                TrackingEngine.start. Default is no limit.
+
+        Yields:
+            dict: Per-frame result, see TrackingEngine.process_frame.
+        """
+        self.engine.start(max_frames)
+        self._threads = [
+            threading.Thread(target=self._capture, daemon=True),
+            threading.Thread(target=self._detect, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        while True:
+            result = self._results.get()
+            if result is None:
+                break
+            yield result
+        self.join()
+
+    def stop(self):
+        """
+        Stop the engine and all stages and wait for their threads to exit.
+        """
+        self.engine.stop()
+        self.close()
+
+    def close(self):
+        """
+        Shut the stages down after the consumer is done, without marking the
+        engine as stopped, so a run that ends early on purpose (e.g. at
+        max_frames) still counts as complete.
+        """
+        self._stopped.set()
+        # unblock the detection stage if the consumer went away
+        while any(thread.is_alive() for thread in self._threads):
+            try:
+                self._results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.join()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,139 @@
+import numpy as np
+
+
+class SearchWindow:
+    """
+    Predicts where the bob will be in the next frame and sizes a search
+    window around it.
+
+    The prediction extrapolates the last two detections at constant velocity
+    and, once the pendulum circle is known, snaps the point back onto the arc.
+    The window grows with the measured speed, and the tracker reports no
+    window at all (full-frame search) until it has a lock on the target.
+    """
+
+    def __init__(self, min_half_size=48, velocity_gain=2.0, max_misses=0):
+        """
+        Initialize the SearchWindow.
+
+        Args:
+            min_half_size (int): Smallest half-width of the window in pixels. Default is 48.
+            velocity_gain (float): Extra half-width per pixel/frame of bob speed. Default is 2.0.
+            max_misses (int): Missed frames tolerated before the lock is dropped. Default is 0.
+        """
+        self.min_half_size = min_half_size
+        self.velocity_gain = velocity_gain
+        self.max_misses = max_misses
+        self.circle_params = None
+        self.radius_bob = 0
+        self.reset()
+
+    def reset(self):
+        self.last = None
+        self.previous = None
+        self.misses = 0
+
+    def predict(self, frame_number):
+        """
+        Predict the bob position at a frame.
+
+        Args:
+            frame_number (int): Frame to predict.
+
+        Returns:
+            tuple: Predicted (x, y) and speed in pixels per frame, or None without a lock.
+        """
+        if self.last is None:
+            return None
+
+        last_frame, last_x, last_y = self.last
+        vx = vy = 0.0
+        if self.previous is not None:
+            prev_frame, prev_x, prev_y = self.previous
+            dt = max(last_frame - prev_frame, 1)
+            vx = (last_x - prev_x) / dt
+            vy = (last_y - prev_y) / dt
+
+        steps = frame_number - last_frame
+        x = last_x + vx * steps
+        y = last_y + vy * steps
+
+        if self.circle_params is not None:
+            # keep the prediction on the pendulum arc
+            a, b, r = self.circle_params
+            d = np.hypot(x - a, y - b)
+            if d > 0:
+                x = a + (x - a) * abs(r) / d
+                y = b + (y - b) * abs(r) / d
+
+        return (x, y), np.hypot(vx, vy) * max(steps, 1)
+
+    def bounds(self, frame_number, frame_shape):
+        """
+        Search window for a frame.
+
+        Args:
+            frame_number (int): Frame to search.
+            frame_shape (tuple): Shape of the frame.
+
+        Returns:
+            tuple: (x0, y0, x1, y1) in pixels, or None to search the full frame.
+        """
+        prediction = self.predict(frame_number)
+        if prediction is None:
+            return None
+
+        (x, y), speed = prediction
+        half = int(self.min_half_size + self.radius_bob + self.velocity_gain * speed)
+        height, width = frame_shape[:2]
+        x0 = max(int(x) - half, 0)
+        y0 = max(int(y) - half, 0)
+        x1 = min(int(x) + half, width)
+        y1 = min(int(y) + half, height)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+
+    def update(self, frame_number, center):
+        """
+        Record the detection result of a frame.
+
+        Args:
+            frame_number (int): Frame that was searched.
+            center (tuple): Detected (x, y), or None if the bob was not found.
+        """
+        if center is None:
+            self.misses += 1
+            if self.misses > self.max_misses:
+                self.reset()
+            return
+
+        self.previous = self.last
+        self.last = (frame_number, center[0], center[1])
+        self.misses = 0
+
+
+def shift_observation(observation, dx, dy):
+    """
+    Move an observation made in a cropped window back to frame coordinates.
+
+    Args:
+        observation (Observation): Detection inside the window, or None.
+        dx (int): X offset of the window.
+        dy (int): Y offset of the window.
+
+    Returns:
+        Observation: The shifted detection, or None.
+    """
+    if observation is None:
+        return None
+
+    x, y, w, h = observation.bbox
+    contour = observation.contour
+    if contour is not None:
+        contour = contour + np.array([dx, dy], dtype=contour.dtype)
+    return observation._replace(
+        center=(observation.center[0] + dx, observation.center[1] + dy),
+        bbox=(x + dx, y + dy, w, h),
+        contour=contour,
+    )
@@ -1,14 +1,13 @@
 import os
+import time
 import cv2
 import numpy as np
-from processing.detector import ImageProcessor
-from scipy.optimize import least_squares
-import csv
+from processing.engine import TrackingEngine
+from processing.pipeline import FramePipeline
+from utils.track_buffer import TrackBuffer, PLOT_DTYPE
+from utils.track_writer import TrackWriter
 from utils.utils import (
-    load_json,
     get_project_root,
-    circle_residuals,
-    rotate_opencv_point,
     dist,
 )
 from utils.contansts import WHITE, BLACK, BLUE, CYAN, GREEN, RED
@@ -22,182 +21,250 @@ class VideoThread(QThread):
     # Define custom signals for communication with the main application
     update_hsv_range_signal = pyqtSignal(int, int, int, int, int, int)
     finished_signal = pyqtSignal()
-    change_pixmap_signal = pyqtSignal(np.ndarray)
-    new_contour_signal = pyqtSignal(float, float)
+    # display-ready RGB image and the number of the frame it shows
+    change_pixmap_signal = pyqtSignal(np.ndarray, int)
+    new_points_signal = pyqtSignal(np.ndarray)
     parameter_signal = pyqtSignal(dict)
     processing_signal = pyqtSignal(int)
 
     # initial values
-    initial_circle_guess = np.array([248, 8, 435])
-    circle_params = initial_circle_guess
     original_pivot = (248, 7)
 
     # bools
-    circle_threshold_reached = False
+    # stream every detection to data/npy/track_<date>_<time>.npy while running
     save_data = True
 
+    # seconds between batches of plot points, about one per display refresh
+    point_flush_interval = 1 / 30
+
     def __init__(
         self,
         video_path,
         display_option,
         mask_option,
         draw_params=False,
+        roi=False,
+        queue_policy=None,
+        downscale=1,
+        display_size=(1280, 720),
+        display_fps=60,
+        cache=None,
+        metrics=None,
+        detect_interval=1,
+        max_uncertainty=None,
+        sample_rate=None,
+        calibration_samples=0,
     ):
         super().__init__()
-        self._run_flag = True
-        self.cap = cv2.VideoCapture(video_path)
-        self.frame_rate = int(self.cap.get(cv2.CAP_PROP_FPS))
         self.display_option = display_option
         self.mask_option = mask_option
         self.draw_params = draw_params
+
+        # frames are sized for the label here and emitted at most once per
+        # refresh; a frame is skipped while the GUI still has one to show
+        self.display_size = display_size
+        self.display_interval = 1 / display_fps if display_fps > 0 else 0
+        self._frame_pending = False
+        self.cache = cache
         self.update_hsv_range_signal.connect(self.update_hsv_range)
 
-        # internal data
-        self.hsvVals = load_json(os.path.join(data_folder, "json", "hsv.json"))
-        self.data_points = np.empty((0, 3), dtype=float)
-        self.width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-        self.height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-        self.params = {
-            "angle_rad": 0,
-        }
+        # all detection and fitting is delegated to the Qt-free engine
+        self.engine = TrackingEngine(
+            video_path,
+            mask_option=mask_option,
+            on_params=self.parameter_signal.emit,
+            on_progress=self.processing_signal.emit,
+            roi=roi,
+            downscale=downscale,
+            metrics=metrics,
+            detect_interval=detect_interval,
+            max_uncertainty=max_uncertainty,
+            sample_rate=sample_rate,
+            calibration_samples=calibration_samples,
+        )
+        self.metrics = self.engine.metrics
+        self.frame_rate = self.engine.frame_rate
+        self.engine.keep_mask = display_option == "Mask"
 
-        # image processor initialization
-        self.processor = ImageProcessor(self.hsvVals)
+        # capture and detection run on their own threads, this thread renders
+        self.pipeline = FramePipeline(self.engine, policy=queue_policy)
 
-    def calculate_static_params(self):
-        if len(self.data_points) == 0:
-            return
-        x_data = self.data_points[:, 0]  # x positions
-        y_data = self.data_points[:, 1]  # y positions
+    @property
+    def params(self):
+        return self.engine.params
 
-        # attempting to fit the values in a circle
-        circle_result = least_squares(
-            circle_residuals, self.initial_circle_guess, args=(x_data, y_data)
-        )
+    @property
+    def circle_params(self):
+        return self.engine.circle_params
 
-        self.circle_params = circle_result.x
-        fitted_a, fitted_b, fitted_r = self.circle_params
+    def run(self):
+        frame_offset = self.engine.frame_offset
+        key = self.engine.cache_key(self.cache)
+        if key is not None and self.show_cached(key):
+            return
 
-        self.calculate_rotation_angle(fitted_a, fitted_b)
+        if self.save_data:
+            self.engine.recorder = TrackWriter(self.record_path())
+        points = TrackBuffer(PLOT_DTYPE, capacity=256)
+        last_flush = time.monotonic()
+        last_display = 0.0
+        processed = 0
+
+        for result in self.pipeline.results():
+            frame_number = result["frame_number"]
+            processed += 1
+
+            # calibration detections are plotted once the circle fit is known,
+            # at most one per 10 frames like the live points; with a sample
+            # rate the frames are sparse, so they are bucketed rather than
+            # filtered by frame number
+            bucket = -1
+            for replayed_number, x_transformed in result["replayed"]:
+                if replayed_number // 10 != bucket:
+                    bucket = replayed_number // 10
+                    points.append(replayed_number - frame_offset + 1, x_transformed)
+
+            if (
+                result["center"] is not None
+                and result["calibrated"]
+                and frame_number % 10 == 0
+                and not result["replayed"]
+            ):
+                points.append(frame_number - frame_offset + 1, result["x_transformed"])
+
+            now = time.monotonic()
+            if len(points) and now - last_flush >= self.point_flush_interval:
+                self.flush_points(points)
+                last_flush = now
+
+            if self._frame_pending:
+                self.metrics.count("display_skipped")
+            elif now - last_display >= self.display_interval:
+                last_display = now
+                self._frame_pending = True
+                self.show_frame(result)
+
+        self.flush_points(points)
+        self.engine.release()
+        if self.engine.recorder is not None:
+            self.engine.recorder.close()
+        if key is not None:
+            self.engine.store_cached(self.cache, key, processed)
+        self.finished_signal.emit()
 
-        self.params["mean_point"] = self.calculate_mean_point()
-        self.params["center"] = (int(fitted_a), int(fitted_b))
-        self.params["length"] = int(fitted_r)
-        self.parameter_signal.emit(self.params)
+    def show_frame(self, result):
+        metrics = self.metrics
+        start = metrics.clock()
+        image = self.render(result)
+        metrics.record("render", start)
+
+        start = metrics.clock()
+        image = self.to_display(image, self.display_size)
+        metrics.record("convert", start)
+
+        start = metrics.clock()
+        self.change_pixmap_signal.emit(image, result["frame_number"])
+        metrics.record("emit", start)
+
+    def show_cached(self, key):
+        """
+        Plot the cached detections of this video instead of processing it.
+
+        Returns:
+            bool: True on a cache hit.
+        """
+        if self.engine.load_cached(self.cache, key) is None:
+            return False
+
+        track = self.engine.track.view()
+        if len(self.engine.predicted):
+            track = np.sort(np.concatenate([track, self.engine.predicted.view()]), order="frame")
+        # first detection of every 10 frames, see run()
+        buckets = track["frame"] // 10
+        every_tenth = track[np.r_[True, buckets[1:] != buckets[:-1]]] if len(track) else track
+        points = np.zeros(len(every_tenth), PLOT_DTYPE)
+        points["frame"] = every_tenth["frame"].astype(np.float32) - self.engine.frame_offset + 1
+        points["x"] = self.engine.transform(every_tenth["x"], every_tenth["y"])
+        self.new_points_signal.emit(points)
+
+        self.engine.release()
+        self.finished_signal.emit()
+        return True
 
-    def calculate_rotation_angle(self, fitted_a, fitted_b):
-        # Calculate the angles of data points with respect to the circle's center
-        self.data_points = np.array(self.data_points)
-        mean_x = np.mean(self.data_points[:, 0])
-        mean_y = np.mean(self.data_points[:, 1])
+    @staticmethod
+    def record_path():
+        folder = os.path.join(data_folder, "npy")
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, time.strftime("track_%Y%m%d_%H%M%S.npy"))
+
+    def flush_points(self, points):
+        """
+        Emit the buffered plot points as one (frame, x) chunk and clear the buffer.
+        """
+        if len(points):
+            # the receiver runs on the GUI thread, so it gets its own copy
+            self.new_points_signal.emit(points.view().copy())
+            points.clear()
+
+    def render(self, result):
+        """
+        Build the image to display for a frame result.
+
+        Annotations are drawn here, in place on the decoded frame, so detection
+        never pays for them and the "Mask" display skips them entirely.
+
+        Args:
+            result (dict): Per-frame result from TrackingEngine.process_frame.
+
+        Returns:
+            numpy.ndarray: Image to display.
+        """
+        if self.display_option == "Mask":
+            return result["mask"]
+
+        frame = result["frame"]
+        if self.display_option == "Image Contours":
+            self.engine.processor.annotate(frame, result["observation"])
+        if result["center"] is not None and result["calibrated"]:
+            self.draw_param(frame, result["center"])
+        return frame
 
-        OFFSET = 90
-        rotation_angle = np.arctan2(fitted_b - mean_y, fitted_a - mean_x) + np.radians(
-            OFFSET
-        )
-        self.params["angle_rad"] = rotation_angle
-
-    def calculate_mean_point(self):
-        mean_x = np.mean(self.data_points[:, 0])
-        mean_y = np.mean(self.data_points[:, 1])
-        return (int(mean_x), int(mean_y))
-    
-    def preprocessing(self):
-        count = 0
-        frame_offset = 50
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_offset)
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-        while count < total_frames and count < 2000:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-            if self.mask_option == "Color Detection":
-                mask = self.processor.get_color_mask(frame)
-            elif self.mask_option == "Edge Detection":
-                mask = self.processor.get_edges(frame)
-            else:
-                mask = self.processor.get_best_circle(frame)
-
-            contours_output = self.processor.get_contours(frame, mask)
-            contours = contours_output["contours"]
-            if contours:
-                cx, cy = contours[0]["center"]
-                radius_bob = (contours[0]["bbox"][2] + contours[0]["bbox"][3]) / 4
-                self.data_points = np.append(self.data_points,[[cx, cy, count]],axis=0,)
-
-            count += 1
-            self.processing_signal.emit(int((count/2000) * 100))
-
-        self.calculate_static_params()
-        self.params["radius_bob"] = radius_bob
-        self.data_points = np.empty((0, 3), dtype=float)
+    @staticmethod
+    def to_display(image, size):
+        """
+        Scale an image to fit a display size and convert it to RGB.
+
+        Args:
+            image (numpy.ndarray): BGR frame or single-channel mask.
+            size (tuple): (width, height) to fit, keeping the aspect ratio.
+
+        Returns:
+            numpy.ndarray: Contiguous RGB image ready to wrap in a QImage.
+        """
+        height, width = image.shape[:2]
+        scale = min(size[0] / width, size[1] / height)
+        if scale > 0 and abs(scale - 1) > 1e-3:
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            image = cv2.resize(
+                image,
+                (max(int(width * scale), 1), max(int(height * scale), 1)),
+                interpolation=interpolation,
+            )
+        code = cv2.COLOR_GRAY2RGB if image.ndim == 2 else cv2.COLOR_BGR2RGB
+        return cv2.cvtColor(image, code)
 
-    def run(self):
-        frame_number = 0
-        frame_offset = 50
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-        if total_frames != -1:
-            self.preprocessing()
-
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_offset)
-        while self._run_flag:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-            if self.mask_option == "Color Detection":
-                mask = self.processor.get_color_mask(frame)
-            elif self.mask_option == "Edge Detection":
-                mask = self.processor.get_edges(frame)
-            else:
-                mask = self.processor.get_best_circle(frame)
-
-            contours_output = self.processor.get_contours(frame, mask)
-
-            if self.display_option == "Image Contours":
-                frame = contours_output["image_contours"]
-
-            contours = contours_output["contours"]
-
-            if contours:
-                cx, cy = contours[0]["center"]
-                radius_bob = (contours[0]["bbox"][2] + contours[0]["bbox"][3]) / 4
-                fitted_a, fitted_b, _ = self.circle_params
-
-                if total_frames == -1 and frame_number % 25 == 0:
-                    self.data_points = np.append(
-                        self.data_points,
-                        [[cx, cy, frame_number]],
-                        axis=0,
-                    )
-                    self.calculate_static_params()
-                    self.params["radius_bob"] = radius_bob
-
-                x_transformed, _ = rotate_opencv_point(
-                    cx, cy, fitted_a, fitted_b, self.params["angle_rad"], self.height
-                )
-                self.draw_param(frame, (cx, cy))
-                if frame_number % 10 == 0:
-                    # emit signals
-                    self.new_contour_signal.emit(
-                        frame_number - frame_offset + 1, x_transformed
-                    )
-
-            frame_number += 1
-
-            if self.display_option == "Mask":
-                self.change_pixmap_signal.emit(mask)
-            else:
-                self.change_pixmap_signal.emit(frame)
-
-        self.cap.release()
-        self.finished_signal.emit()
+    def frame_displayed(self, width, height, frame_number):
+        """
+        Called from the GUI once a frame is shown, with the current label size.
+        """
+        self.display_size = (width, height)
+        self._frame_pending = False
+        self.metrics.mark_displayed(frame_number)
 
     def draw_param(self, frame, bob_pos):
         if not self.draw_params or not self.params:
             return
-        cx, cy = bob_pos
+        cx, cy = int(round(bob_pos[0])), int(round(bob_pos[1]))
         fitted_a, fitted_b, fitted_r = self.circle_params
 
         # original pivot
@@ -235,7 +302,7 @@ class VideoThread(QThread):
         )
 
     def stop(self):
-        self._run_flag = False
+        self.engine.stop()
         self.wait()
 
     @pyqtSlot(int, int, int, int, int, int)
@@ -248,17 +315,7 @@ class VideoThread(QThread):
             "smax": smax,
             "vmax": vmax,
         }
-        self.processor.hsv_vals = hsv_vals
-
-    @staticmethod
-    def save_to_csv(filename, data_points):
-        filename = os.path.join(data_folder, "csv", filename)
-        with open(filename, "w", newline="") as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerow(["X Position", "Y Position", "Time"])
-
-            for cx, cy, time in data_points:
-                csv_writer.writerow([cx, cy, time])
+        self.engine.processor.hsv_vals = hsv_vals
 
     @staticmethod
     def draw_tangent_line(image, point, theta, color=(0, 255, 0), thickness=2):
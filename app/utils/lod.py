@@ -0,0 +1,159 @@
+import numpy as np
+from utils.track_buffer import TrackBuffer
+
+# one reduced block: where and what the extremes are
+LOD_DTYPE = np.dtype(
+    [("x_min", np.float64), ("min", np.float32), ("x_max", np.float64), ("max", np.float32)]
+)
+
+
+def reduce_blocks(x_min, y_min, x_max, y_max, factor):
+    """
+    Merge every `factor` consecutive blocks into one min/max block.
+
+    Args:
+        x_min, y_min: Positions and values of the block minima.
+        x_max, y_max: Positions and values of the block maxima.
+        factor (int): Blocks merged into one.
+
+    Returns:
+        numpy.ndarray: Merged blocks with LOD_DTYPE; a partial trailing group is dropped.
+    """
+    count = len(y_min) // factor
+    blocks = np.zeros(count, LOD_DTYPE)
+    if count == 0:
+        return blocks
+
+    rows = np.arange(count)
+    lo = y_min[: count * factor].reshape(count, factor).argmin(axis=1)
+    hi = y_max[: count * factor].reshape(count, factor).argmax(axis=1)
+    blocks["x_min"] = x_min[: count * factor].reshape(count, factor)[rows, lo]
+    blocks["min"] = y_min[: count * factor].reshape(count, factor)[rows, lo]
+    blocks["x_max"] = x_max[: count * factor].reshape(count, factor)[rows, hi]
+    blocks["max"] = y_max[: count * factor].reshape(count, factor)[rows, hi]
+    return blocks
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max summary of an append-only (x, y) series.
+
+    Level k holds one block per factor**k samples with the position and value
+    of the block's minimum and maximum. A query picks the coarsest level that
+    still gives about one block per screen pixel, so the drawn point count is
+    independent of the series length and no peak is dropped by decimation.
+    The series itself is not copied; update() is given the current arrays.
+    """
+
+    def __init__(self, factor=4):
+        """
+        Initialize the MinMaxPyramid.
+
+        Args:
+            factor (int): Samples per block from one level to the next. Default is 4.
+        """
+        self.factor = factor
+        self.clear()
+
+    def clear(self):
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.levels = []
+
+    def __len__(self):
+        return len(self.x)
+
+    def update(self, x, y):
+        """
+        Bring the pyramid up to date with a grown series.
+
+        Only the samples added since the previous call are reduced. x must be
+        sorted, and the samples already seen must not have changed; call
+        clear() first to replace the series.
+
+        Args:
+            x: All x values of the series (e.g. a TrackBuffer column view).
+            y: All y values of the series.
+        """
+        self.x = x
+        self.y = y
+
+        lower_x_min, lower_min = x, y
+        lower_x_max, lower_max = x, y
+        block = 1
+        level = 0
+        while len(x) >= block * self.factor:
+            block *= self.factor
+            if level == len(self.levels):
+                self.levels.append(TrackBuffer(LOD_DTYPE, capacity=max(len(x) // block, 1)))
+            blocks = self.levels[level]
+
+            # reduce only the complete groups the level does not have yet
+            done = len(blocks) * self.factor
+            new = reduce_blocks(
+                lower_x_min[done:],
+                lower_min[done:],
+                lower_x_max[done:],
+                lower_max[done:],
+                self.factor,
+            )
+            blocks.extend(new)
+
+            view = blocks.view()
+            lower_x_min, lower_min = view["x_min"], view["min"]
+            lower_x_max, lower_max = view["x_max"], view["max"]
+            level += 1
+
+    def query(self, x0, x1, max_points):
+        """
+        Points to draw for the x range [x0, x1] at a given resolution.
+
+        Args:
+            x0 (float): Start of the visible range.
+            x1 (float): End of the visible range.
+            max_points (int): Target number of points, e.g. the plot width in pixels.
+
+        Returns:
+            tuple: x and y arrays, in x order. Includes one sample beyond each end
+            of the range so lines run to the plot edges.
+        """
+        # bounds in the series dtype, so searchsorted does not convert the series
+        x0, x1 = np.array([x0, x1]).astype(self.x.dtype)
+        start = max(int(np.searchsorted(self.x, x0, side="left")) - 1, 0)
+        stop = min(int(np.searchsorted(self.x, x1, side="right")) + 1, len(self.x))
+        if stop - start <= max(max_points, 2):
+            return self.x[start:stop], self.y[start:stop]
+
+        # finest level with at most max_points / 2 blocks (two points each)
+        level = 0
+        block = 1
+        while level < len(self.levels) and (stop - start) // block > max(max_points // 2, 1):
+            block *= self.factor
+            level += 1
+        if level == 0:
+            return self.x[start:stop], self.y[start:stop]
+
+        blocks = self.levels[level - 1].view()
+        first = start // block
+        last = min(-(-stop // block), len(blocks))
+        parts = [blocks[first:last]]
+
+        # samples past the last complete block are reduced on the fly
+        tail = max(len(blocks) * block, start)
+        if tail < stop:
+            lo = tail + int(np.argmin(self.y[tail:stop]))
+            hi = tail + int(np.argmax(self.y[tail:stop]))
+            parts.append(
+                np.array([(self.x[lo], self.y[lo], self.x[hi], self.y[hi])], LOD_DTYPE)
+            )
+        selected = np.concatenate(parts)
+
+        # each block contributes its extremes in the order they occur
+        min_first = selected["x_min"] <= selected["x_max"]
+        xs = np.empty(len(selected) * 2)
+        ys = np.empty(len(selected) * 2, dtype=np.float32)
+        xs[0::2] = np.where(min_first, selected["x_min"], selected["x_max"])
+        xs[1::2] = np.where(min_first, selected["x_max"], selected["x_min"])
+        ys[0::2] = np.where(min_first, selected["min"], selected["max"])
+        ys[1::2] = np.where(min_first, selected["max"], selected["min"])
+        return xs, ys
@@ -0,0 +1,164 @@
+import csv
+import json
+import time
+from collections import OrderedDict, defaultdict
+import numpy as np
+
+perf_counter = time.perf_counter
+
+
+class RollingStats:
+    """
+    Keeps the latest `window` samples of a duration for percentiles.
+    """
+
+    def __init__(self, window=512):
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def summary(self):
+        """
+        Count, overall mean and max, and percentiles of the recent window, in ms.
+        """
+        recent = self.samples[: min(self.count, len(self.samples))] * 1000
+        p50, p95, p99 = np.percentile(recent, (50, 95, 99)) if len(recent) else (0, 0, 0)
+        return {
+            "count": self.count,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": self.max * 1000,
+        }
+
+
+class Metrics:
+    """
+    Per-stage timers, counters and capture-to-display latency.
+
+    Timing a stage is two calls around it:
+
+        start = metrics.clock()
+        ...
+        metrics.record("detect", start)
+
+    When disabled, clock() returns 0 and record() returns immediately, so the
+    instrumentation stays in place at the cost of two attribute checks.
+    Stages can be recorded from several threads; a sample lost to a race
+    only affects the statistics.
+    """
+
+    def __init__(self, enabled=True, window=512, max_pending=1024):
+        """
+        Initialize the Metrics.
+
+        Args:
+            enabled (bool): Collect anything at all. Default is True.
+            window (int): Samples per stage kept for percentiles. Default is 512.
+            max_pending (int): Captured frames awaiting display that are tracked
+                for latency. Default is 1024.
+        """
+        self.enabled = enabled
+        self.window = window
+        self.max_pending = max_pending
+        self.reset()
+
+    def reset(self):
+        self.stages = defaultdict(lambda: RollingStats(self.window))
+        self.counters = defaultdict(int)
+        self._captured = OrderedDict()
+        self.started = perf_counter()
+
+    def clock(self):
+        return perf_counter() if self.enabled else 0.0
+
+    def record(self, stage, start):
+        """
+        Record the time since `start` (from clock()) for a stage.
+        """
+        if self.enabled:
+            self.stages[stage].add(perf_counter() - start)
+
+    def add_duration(self, stage, seconds):
+        if self.enabled:
+            self.stages[stage].add(seconds)
+
+    def count(self, counter, n=1):
+        if self.enabled:
+            self.counters[counter] += n
+
+    def mark_captured(self, frame_id):
+        """
+        Remember when a frame was decoded.
+        """
+        if not self.enabled:
+            return
+        self._captured[frame_id] = perf_counter()
+        if len(self._captured) > self.max_pending:
+            # frames that are never displayed must not accumulate
+            self._captured.popitem(last=False)
+
+    def mark_displayed(self, frame_id):
+        """
+        Record the capture-to-display latency of a frame.
+        """
+        if not self.enabled:
+            return
+        captured = self._captured.pop(frame_id, None)
+        if captured is not None:
+            self.stages["latency"].add(perf_counter() - captured)
+
+    def snapshot(self):
+        """
+        Current statistics as a JSON-serializable dict.
+        """
+        return {
+            "elapsed_s": perf_counter() - self.started,
+            "stages": {name: stats.summary() for name, stats in list(self.stages.items())},
+            "counters": dict(self.counters),
+        }
+
+    def format(self):
+        """
+        Short multi-line text of the stage percentiles and counters for an overlay.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"{name:<10} p50 {stats['p50_ms']:6.2f}  p95 {stats['p95_ms']:6.2f} ms"
+            for name, stats in snapshot["stages"].items()
+        ]
+        lines += [f"{name:<10} {value}" for name, value in snapshot["counters"].items()]
+        return "\n".join(lines)
+
+    def save(self, filename):
+        """
+        Write the current statistics as JSON, or as one CSV row per stage and
+        counter when the filename ends in .csv.
+        """
+        snapshot = self.snapshot()
+        if not filename.lower().endswith(".csv"):
+            with open(filename, "w") as f:
+                json.dump(snapshot, f, indent=2)
+            return
+
+        fields = ["name", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+        with open(filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for name, stats in snapshot["stages"].items():
+                writer.writerow(dict(stats, name=name))
+            for name, value in snapshot["counters"].items():
+                writer.writerow({"name": name, "count": value})
+
+
+# shared disabled instance for components created without metrics
+NO_METRICS = Metrics(enabled=False)
@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+
+# fixed-point bits for sub-pixel circle drawing
+DRAW_SHIFT = 4
+
+# ground truth of a rendered frame
+TRUTH_DTYPE = np.dtype(
+    [("frame", np.uint32), ("time", np.float64), ("x", np.float64), ("y", np.float64)]
+)
+
+
+def pendulum_angle(t, theta0=0.3, gamma=0.05, omega=3.0, phi=0.0):
+    """
+    Swing angle of an underdamped pendulum in radians.
+    """
+    return theta0 * np.exp(-gamma * t) * np.cos(omega * t + phi)
+
+
+# Function to render a synthetic pendulum video with known ground truth
+def render_pendulum_video(
+    filename,
+    frames=1500,
+    width=640,
+    height=480,
+    fps=60,
+    pivot=(320, 20),
+    length=400,
+    theta0=0.3,
+    gamma=0.05,
+    omega=3.0,
+    phi=0.0,
+    tilt=0.0,
+    bob_radius=15,
+    bob_color=(0, 0, 255),
+    background=(200, 200, 200),
+    noise=0.0,
+    blur=0.0,
+    seed=0,
+):
+    """
+    Render a coloured bob swinging on a damped trajectory.
+
+    The bob is drawn with sub-pixel accuracy at
+    pivot + length * (sin(theta + tilt), cos(theta + tilt)), where theta
+    follows pendulum_angle and tilt rotates the whole swing as a tilted
+    camera would.
+
+    Args:
+        filename (str): Output path; .avi files are written as MJPG.
+        frames (int): Number of frames. Default is 1500.
+        width (int): Frame width in pixels. Default is 640.
+        height (int): Frame height in pixels. Default is 480.
+        fps (float): Frame rate. Default is 60.
+        pivot (tuple): Pivot (x, y) in pixels. Default is (320, 20).
+        length (float): Pendulum length in pixels. Default is 400.
+        theta0, gamma, omega, phi: Parameters of pendulum_angle.
+        tilt (float): Camera tilt in radians. Default is 0.
+        bob_radius (int): Bob radius in pixels. Default is 15.
+        bob_color (tuple): BGR color of the bob. Default is red.
+        background (tuple): BGR background color. Default is light gray.
+        noise (float): Standard deviation of additive Gaussian pixel noise. Default is 0.
+        blur (float): Sigma of a Gaussian blur applied to each frame. Default is 0.
+        seed (int): Seed of the noise generator. Default is 0.
+
+    Returns:
+        tuple: (truth, params) with the TRUTH_DTYPE bob center of every frame
+        and a dict of the true parameters.
+    """
+    fourcc = cv2.VideoWriter_fourcc(*"MJPG")
+    writer = cv2.VideoWriter(filename, fourcc, fps, (width, height))
+    if not writer.isOpened():
+        raise IOError(f"Cannot write video: {filename}")
+
+    rng = np.random.default_rng(seed)
+    truth = np.zeros(frames, TRUTH_DTYPE)
+    truth["frame"] = np.arange(frames)
+    truth["time"] = truth["frame"] / fps
+    theta = pendulum_angle(truth["time"], theta0, gamma, omega, phi) + tilt
+    truth["x"] = pivot[0] + length * np.sin(theta)
+    truth["y"] = pivot[1] + length * np.cos(theta)
+
+    scale = 1 << DRAW_SHIFT
+    background_frame = np.empty((height, width, 3), np.uint8)
+    background_frame[:] = background
+    for x, y in zip(truth["x"], truth["y"]):
+        frame = background_frame.copy()
+        center = (int(round(x * scale)), int(round(y * scale)))
+        cv2.circle(
+            frame, center, bob_radius * scale, bob_color, -1, cv2.LINE_AA, DRAW_SHIFT
+        )
+        if blur > 0:
+            frame = cv2.GaussianBlur(frame, (0, 0), blur)
+        if noise > 0:
+            noisy = frame + rng.normal(0, noise, frame.shape)
+            frame = np.clip(noisy, 0, 255).astype(np.uint8)
+        writer.write(frame)
+    writer.release()
+
+    params = {
+        "frames": frames,
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "pivot": list(pivot),
+        "length": length,
+        "theta0": theta0,
+        "gamma": gamma,
+        "omega": omega,
+        "phi": phi,
+        "tilt": tilt,
+        "bob_radius": bob_radius,
+        "noise": noise,
+        "blur": blur,
+    }
+    return truth, params
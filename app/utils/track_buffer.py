@@ -0,0 +1,121 @@
+import numpy as np
+
+# compact record layouts
+TRACK_DTYPE = np.dtype([("x", np.float32), ("y", np.float32), ("frame", np.uint32)])
+PLOT_DTYPE = np.dtype([("frame", np.float32), ("x", np.float32)])
+
+
+class TrackBuffer:
+    """
+    Growable structured array with amortized O(1) appends.
+
+    In ring mode the buffer keeps only the latest `capacity` records. Every
+    record is written twice, `capacity` slots apart, so the live window is
+    always one contiguous slice and view() never has to copy.
+    """
+
+    def __init__(self, dtype=TRACK_DTYPE, capacity=1024, ring=False):
+        """
+        Initialize the TrackBuffer.
+
+        Args:
+            dtype (numpy.dtype): Record layout. Default is TRACK_DTYPE.
+            capacity (int): Initial capacity, or the fixed capacity in ring mode.
+            ring (bool): Keep only the latest `capacity` records. Default is False.
+        """
+        self.dtype = np.dtype(dtype)
+        self.capacity = max(1, int(capacity))
+        self.ring = ring
+        self._data = np.zeros(self.capacity * 2 if ring else self.capacity, self.dtype)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        return self.view()[key]
+
+    def append(self, *values):
+        """
+        Append one record given as positional field values.
+        """
+        if self.ring:
+            index = (self._start + self._size) % self.capacity
+            self._data[index] = values
+            self._data[index + self.capacity] = values
+            if self._size < self.capacity:
+                self._size += 1
+            else:
+                self._start = (self._start + 1) % self.capacity
+            return
+
+        if self._size == len(self._data):
+            self._grow(self._size + 1)
+        self._data[self._size] = values
+        self._size += 1
+
+    def extend(self, records):
+        """
+        Append several records.
+
+        Args:
+            records: Structured array, or a sequence of tuples matching the dtype.
+        """
+        records = np.asarray(records, dtype=self.dtype)
+        if self.ring:
+            for record in records[-self.capacity:]:
+                self.append(*record.item())
+            return
+
+        end = self._size + len(records)
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._size:end] = records
+        self._size = end
+
+    def _grow(self, required):
+        capacity = len(self._data)
+        while capacity < required:
+            capacity *= 2
+        data = np.zeros(capacity, self.dtype)
+        data[: self._size] = self._data[: self._size]
+        self._data = data
+        self.capacity = capacity
+
+    def view(self):
+        """
+        Zero-copy view of the stored records, oldest first.
+        """
+        return self._data[self._start:self._start + self._size]
+
+    def column(self, name):
+        """
+        Zero-copy view of one field of the stored records.
+        """
+        return self.view()[name]
+
+    def set_tail(self, name, values):
+        """
+        Overwrite one field of the latest len(values) records.
+        """
+        count = len(values)
+        if count == 0:
+            return
+        end = self._start + self._size
+        index = np.arange(end - count, end)
+        self._data[name][index] = values
+        if self.ring:
+            # keep the second copy of every record in step
+            mirror = np.where(index >= self.capacity, index - self.capacity, index + self.capacity)
+            self._data[name][mirror] = values
+
+    def truncate(self, size):
+        """
+        Keep only the first `size` records.
+        """
+        self._size = max(0, min(self._size, int(size)))
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
@@ -0,0 +1,112 @@
+import numpy as np
+
+# on-disk track record: frame metadata plus the bob position
+TRACK_FILE_DTYPE = np.dtype(
+    [("frame", "<u4"), ("time", "<f8"), ("x", "<f4"), ("y", "<f4")]
+)
+
+# CSV column names of the record fields
+CSV_HEADERS = {
+    "frame": "Frame",
+    "time": "Time",
+    "x": "X Position",
+    "y": "Y Position",
+    "x_transformed": "X Transformed",
+}
+
+
+def track_dtype(*extra_fields):
+    """
+    Track record layout with additional float32 columns, e.g. "x_transformed".
+    """
+    return np.dtype(TRACK_FILE_DTYPE.descr + [(name, "<f4") for name in extra_fields])
+
+
+# Function to build track records from columns
+def make_track(frame, time, x, y, **extra):
+    """
+    Build a structured track array from columns.
+
+    Args:
+        frame: Frame numbers.
+        time: Time of each frame in seconds.
+        x: X positions.
+        y: Y positions.
+        **extra: Additional float32 columns by field name.
+
+    Returns:
+        numpy.ndarray: Records with TRACK_FILE_DTYPE plus the extra fields.
+    """
+    records = np.zeros(len(frame), track_dtype(*extra))
+    records["frame"] = frame
+    records["time"] = time
+    records["x"] = x
+    records["y"] = y
+    for name, values in extra.items():
+        records[name] = values
+    return records
+
+
+# Function to save a track in the binary format
+def save_track(filename, records):
+    """
+    Save track records as a .npy file, readable with load_track(mmap=True).
+    """
+    np.save(filename, np.ascontiguousarray(records))
+
+
+# Function to load a track from a .npy or legacy .csv file
+def load_track(filename, mmap=True):
+    """
+    Load track records.
+
+    .npy files are memory-mapped by default, so opening is instant and only
+    the pages of the columns and rows actually used are read. CSV files
+    (written by export_csv, or the older X Position,Y Position,Time layout)
+    are parsed in full; missing frame or time columns are zero.
+
+    Args:
+        filename (str): Path of a .npy or .csv track.
+        mmap (bool): Memory-map a .npy file read-only. Default is True.
+
+    Returns:
+        numpy.ndarray: Structured track records.
+    """
+    if not filename.lower().endswith(".csv"):
+        return np.load(filename, mmap_mode="r" if mmap else None)
+
+    with open(filename, "r") as f:
+        header = f.readline().strip().split(",")
+    fields = {value: key for key, value in CSV_HEADERS.items()}
+    names = [fields.get(column, column) for column in header]
+    columns = np.loadtxt(filename, delimiter=",", skiprows=1, ndmin=2)
+
+    extra = [name for name in names if name not in TRACK_FILE_DTYPE.names]
+    records = np.zeros(len(columns), track_dtype(*extra))
+    for index, name in enumerate(names):
+        records[name] = columns[:, index]
+    return records
+
+
+def csv_format(dtype):
+    # enough digits to read every value back exactly
+    if dtype.kind in "ui":
+        return "%d"
+    return "%.9g" if dtype.itemsize == 4 else "%.17g"
+
+
+# Function to export track records to CSV
+def export_csv(filename, records):
+    """
+    Write track records to CSV with one column per field.
+    """
+    names = records.dtype.names
+    formats = [csv_format(records.dtype[name]) for name in names]
+    np.savetxt(
+        filename,
+        np.column_stack([records[name] for name in names]),
+        delimiter=",",
+        fmt=formats,
+        header=",".join(CSV_HEADERS.get(name, name) for name in names),
+        comments="",
+    )
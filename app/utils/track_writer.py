@@ -0,0 +1,122 @@
+import os
+import queue
+import threading
+import time
+import numpy as np
+from utils.track_file import TRACK_FILE_DTYPE
+
+# room for the largest row count in the .npy header
+MAX_SHAPE_DIGITS = 20
+
+
+def npy_header(dtype, rows, size=None):
+    """
+    .npy (version 1.0) header for a 1-d array, padded to a fixed size.
+
+    Args:
+        dtype (numpy.dtype): Record layout.
+        rows (int): Number of records.
+        size (int): Total header size in bytes. Default is the smallest multiple
+            of 64 that fits any row count.
+
+    Returns:
+        bytes: The header, exactly `size` bytes long.
+    """
+    descr = np.lib.format.dtype_to_descr(np.dtype(dtype))
+    text = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (descr, rows)
+    if size is None:
+        longest = len(text) - len(str(rows)) + MAX_SHAPE_DIGITS
+        size = -(-(10 + longest + 1) // 64) * 64
+    # magic, version and header length take 10 bytes; the text ends in a newline
+    text = text.ljust(size - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + np.uint16(len(text)).tobytes() + text.encode("latin1")
+
+
+class TrackWriter:
+    """
+    Streams track records to a .npy file from a background thread.
+
+    append() only puts the record on a queue, so the capture loop never waits
+    for the disk. The writer thread writes blocks of `flush_rows` records, or
+    whatever arrived within `flush_interval` seconds, and then rewrites the
+    fixed-size header with the new row count. After every block the file is a
+    valid .npy of the rows written so far; close() drains the queue and fsyncs.
+    """
+
+    def __init__(self, filename, dtype=TRACK_FILE_DTYPE, flush_rows=1024, flush_interval=0.5):
+        """
+        Initialize the TrackWriter and start its thread.
+
+        Args:
+            filename (str): Path of the .npy file, overwritten if it exists.
+            dtype (numpy.dtype): Record layout. Default is TRACK_FILE_DTYPE.
+            flush_rows (int): Records per write. Default is 1024.
+            flush_interval (float): Longest time in seconds a record waits to be written. Default is 0.5.
+        """
+        self.filename = filename
+        self.dtype = np.dtype(dtype)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.rows = 0
+
+        self._header_size = len(npy_header(self.dtype, 0))
+        self._file = open(filename, "wb")
+        self._file.write(npy_header(self.dtype, 0, self._header_size))
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def append(self, *values):
+        """
+        Queue one record given as positional field values.
+        """
+        self._queue.put(values)
+
+    def _run(self):
+        block = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                values = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                values = ()
+
+            if values is None:
+                self._write(block)
+                return
+            if values:
+                block.append(values)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if len(block) >= self.flush_rows or (block and time.monotonic() >= deadline):
+                self._write(block)
+                block = []
+                deadline = None
+
+    def _write(self, block):
+        if not block:
+            return
+        self._file.write(np.array(block, dtype=self.dtype).tobytes())
+        self.rows += len(block)
+
+        # rows first, then the count, so the header never claims unwritten rows
+        self._file.seek(0)
+        self._file.write(npy_header(self.dtype, self.rows, self._header_size))
+        self._file.seek(0, os.SEEK_END)
+        self._file.flush()
+
+    def close(self):
+        """
+        Write the queued records, fsync the file and stop the thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
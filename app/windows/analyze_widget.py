@@ -1,7 +1,14 @@
 import os
 import math
 from PyQt5.QtCore import pyqtSignal, pyqtSlot
-from PyQt5.QtWidgets import QLabel, QGridLayout, QWidget, QPushButton, QMessageBox
+from PyQt5.QtWidgets import (
+    QLabel,
+    QGridLayout,
+    QWidget,
+    QPushButton,
+    QMessageBox,
+    QCheckBox,
+)
 from utils.utils import save_json, get_project_root
 
 project_root = get_project_root(os.path.dirname(os.path.abspath(__file__)))
@@ -9,6 +16,7 @@ data_folder = os.path.join(project_root, 'data')
 
 class AnalyzeWidget(QWidget):
     analyze_signal = pyqtSignal()
+    live_fit_signal = pyqtSignal(bool)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -62,6 +70,7 @@ class AnalyzeWidget(QWidget):
     def create_buttons(self):
         self.curve_fit_button = QPushButton("Estimate")
         self.save_button = QPushButton("Save")
+        self.live_fit_checkbox = QCheckBox("Live fit")
 
     def create_layout(self):
         layout = QGridLayout()
@@ -73,6 +82,7 @@ class AnalyzeWidget(QWidget):
             layout.addWidget(param_value_label, row, 1)
 
         layout.addWidget(self.curve_fit_button, len(self.param_labels), 0)
+        layout.addWidget(self.live_fit_checkbox, len(self.param_labels), 1)
         layout.addWidget(self.save_button, len(self.param_labels), 2)
 
         layout.addWidget(QLabel("Center: "), 0, 2)
@@ -97,10 +107,19 @@ class AnalyzeWidget(QWidget):
     def connect_buttons(self):
         self.curve_fit_button.clicked.connect(self.trigger_analysis)
         self.save_button.clicked.connect(self.save_params)
+        self.live_fit_checkbox.toggled.connect(self.live_fit_signal.emit)
 
     def trigger_analysis(self):
         self.analyze_signal.emit()
 
+    @pyqtSlot(int)
+    def show_fit_progress(self, progress):
+        self.curve_fit_button.setText(f"Cancel ({progress}%)")
+
+    @pyqtSlot()
+    def fit_finished(self):
+        self.curve_fit_button.setText("Estimate")
+
     def update_params(self, params):
         self.params = params
         for i, value_label in enumerate(self.param_value_labels):
@@ -14,11 +14,15 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPixmap, QColor
 import pyqtgraph as pg
 import os
-import cv2
-from PyQt5.QtCore import pyqtSlot, Qt
+from PyQt5.QtCore import pyqtSlot, Qt, QTimer
 import numpy as np
-from scipy.optimize import curve_fit
 from processing.video_thread import VideoThread
+from processing.fit_worker import FitWorker
+from processing.detection_cache import DetectionCache
+from processing.fitting import load_saved_params
+from utils.track_buffer import TrackBuffer, PLOT_DTYPE
+from utils.lod import MinMaxPyramid
+from utils.metrics import Metrics
 from windows.hsv_slider import HSVSlider
 from windows.analyze_widget import AnalyzeWidget
 from utils.utils import (
@@ -26,7 +30,6 @@ from utils.utils import (
     upper_decaying_component_curve,
     lower_decaying_component_curve,
 )
-from utils.contansts import lower_bounds, upper_bounds, initial_guess
 
 
 class AppWindow(QWidget):
@@ -36,6 +39,7 @@ class AppWindow(QWidget):
         # Constants
         self.postion_plot_color = QColor(3, 252, 194)
         self.fitted_plot_color = QColor(255, 127, 80)
+        self.plot_title = "Position v/s frame plot"
 
         # Initialize attributes
         self.setWindowTitle("Harmonic Oscillator")
@@ -43,8 +47,12 @@ class AppWindow(QWidget):
         self.display_height = 720
         self.video_path = None
         self.initial_guess = [1.0, 0.1, 1.0, 0.0, 0.0]
-        self.data_points = []
+        self.data_points = TrackBuffer(PLOT_DTYPE)
         self.thread = None
+        self.fit_worker = None
+        self.last_fit_params = None
+        self.detection_cache = DetectionCache()
+        self.metrics = Metrics(enabled=False)
         self.selected_display_option = "Image Contours"
         self.selected_mask_option = "Color Detection"
         self.draw_params = True
@@ -55,6 +63,9 @@ class AppWindow(QWidget):
         self.create_graph_layout()
         self.create_hsv_slider()
         self.create_analyze_widget()
+        self.create_live_fit_timer()
+        self.create_plot_timer()
+        self.create_stats_timer()
 
         # Set up the main layout
         self.create_layout()
@@ -84,6 +95,11 @@ class AppWindow(QWidget):
         self.draw_param_button = QPushButton("Hide Param", self)
         self.draw_param_button.clicked.connect(self.draw_param_selection)
 
+        # "Stats" button
+        self.stats_button = QPushButton("Stats", self)
+        self.stats_button.setCheckable(True)
+        self.stats_button.toggled.connect(self.stats_toggled)
+
         # URL Input Dialog
         self.url_button = QPushButton("URL", self)
         self.url_button.clicked.connect(self.url_submission)
@@ -110,7 +126,7 @@ class AppWindow(QWidget):
 
     def create_graph_layout(self):
         self.graph_layout = pg.GraphicsLayoutWidget()
-        self.plot = self.graph_layout.addPlot(title="Position v/s frame plot")
+        self.plot = self.graph_layout.addPlot(title=self.plot_title)
         self.plot.showGrid(x=True, y=True)
         self.plot.addLegend()
         self.plot.setLabel("left", "X position of BOB")
@@ -127,9 +143,6 @@ class AppWindow(QWidget):
             symbolSize=3,
             name="Actual Position",
         )
-        self.position_plot_data.setDownsampling(auto=True, method="subsample")
-        self.position_plot_data.setClipToView(True)
-        self.position_plot_data.setClipToView(True)
 
         # curve fit plot
         self.fitted_plot_data = self.plot.plot(
@@ -148,6 +161,17 @@ class AppWindow(QWidget):
             name="Decay Curve",
         )
 
+        # every curve draws from a min/max pyramid at the visible resolution
+        self.lod_curves = [
+            (self.position_plot_data, MinMaxPyramid()),
+            (self.fitted_plot_data, MinMaxPyramid()),
+            (self.upper_decay_plot, MinMaxPyramid()),
+            (self.lower_decay_plot, MinMaxPyramid()),
+        ]
+        view_box = self.plot.getViewBox()
+        view_box.sigXRangeChanged.connect(self.refresh_lod)
+        view_box.sigResized.connect(self.refresh_lod)
+
     def create_hsv_slider(self):
         # HSVSlider
         self.hsv_slider = HSVSlider(self)
@@ -157,8 +181,48 @@ class AppWindow(QWidget):
         # Analyze widget
         self.analyze_widget = AnalyzeWidget(self)
         self.analyze_widget.analyze_signal.connect(self.fit_data_point)
+        self.analyze_widget.live_fit_signal.connect(self.live_fit_toggled)
         self.analyze_widget.setEnabled(False)
 
+    def create_live_fit_timer(self):
+        # Refit periodically while the video is running
+        self.live_fit_timer = QTimer(self)
+        self.live_fit_timer.setInterval(2000)
+        self.live_fit_timer.timeout.connect(self.live_refit)
+
+    def create_stats_timer(self):
+        # Timing overlay in the corner of the video, refreshed twice a second
+        self.stats_label = QLabel(self.video_label)
+        self.stats_label.setStyleSheet(
+            "font-family: monospace; font-size: 11px; color: white;"
+            "background-color: rgba(0, 0, 0, 160); padding: 4px;"
+        )
+        self.stats_label.move(8, 8)
+        self.stats_label.hide()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(500)
+        self.stats_timer.timeout.connect(self.update_stats)
+
+    def stats_toggled(self, enabled):
+        self.metrics.enabled = enabled
+        self.stats_label.setVisible(enabled)
+        if enabled:
+            self.update_stats()
+            self.stats_timer.start()
+        else:
+            self.stats_timer.stop()
+
+    def update_stats(self):
+        self.stats_label.setText(self.metrics.format() or "No samples yet")
+        self.stats_label.adjustSize()
+
+    def create_plot_timer(self):
+        # Redraw the position plot at a capped rate, not once per point batch
+        self.plot_dirty = False
+        self.plot_timer = QTimer(self)
+        self.plot_timer.setInterval(50)
+        self.plot_timer.timeout.connect(self.redraw_graph)
+
     def create_layout(self):
         # Create layouts for buttons
         button_layout = QHBoxLayout()
@@ -170,6 +234,7 @@ class AppWindow(QWidget):
         button_layout.addWidget(self.display_options)
         button_layout.addWidget(self.mask_options)
         button_layout.addWidget(self.draw_param_button)
+        button_layout.addWidget(self.stats_button)
 
         # Create a vertical splitter for the second row (video and graph)
         video_graph_splitter = QSplitter(Qt.Horizontal)
@@ -261,42 +326,62 @@ class AppWindow(QWidget):
 
     @pyqtSlot(int)
     def processing_frame(self, count):
-        self.video_label.setText(f"Loading: {count}%")
+        # shown on the plot, the video label is busy with the frames
+        if count < 100:
+            self.plot.setTitle(f"{self.plot_title} (Loading: {count}%)")
+        else:
+            self.plot.setTitle(self.plot_title)
+
+    @pyqtSlot(np.ndarray, int)
+    def update_image(self, rgb_img, frame_number):
+        """Updates the image_label with an RGB image already sized for it"""
+        self.video_label.setPixmap(self.convert_cv_qt(rgb_img))
+
+        # ask for the next frame at the label's current size
+        if self.thread:
+            size = self.video_label.size()
+            self.thread.frame_displayed(size.width(), size.height(), frame_number)
 
     @pyqtSlot(np.ndarray)
-    def update_image(self, cv_img):
-        """Updates the image_label with a new opencv image"""
-        qt_img = self.convert_cv_qt(cv_img)
-
-        # Calculate the scaled size while maintaining the aspect ratio
-        scaled_size = qt_img.size().scaled(self.video_label.size(), Qt.KeepAspectRatio)
-
-        # Set the scaled pixmap
-        self.video_label.setPixmap(qt_img.scaled(scaled_size, Qt.KeepAspectRatio))
-
-    @pyqtSlot(float, float)
-    def update_graph(self, frame, cx):
-        if self.thread and self.thread.isRunning():
-            self.data_points.append((frame, cx))
-            if len(self.data_points) != 0:
-                x_data = np.array(self.data_points)[:, 0]
-                y_data = np.array(self.data_points)[:, 1]
-                self.position_plot_data.setData(x=x_data, y=y_data)
-
-    def convert_cv_qt(self, cv_img):
-        """Convert from an opencv image to QPixmap"""
-        rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
+    def update_graph(self, points):
+        self.data_points.extend(points)
+        self.plot_dirty = True
+
+    def redraw_graph(self):
+        if not self.plot_dirty:
+            return
+        self.plot_dirty = False
+        _, position_lod = self.lod_curves[0]
+        position_lod.update(self.data_points.column("frame"), self.data_points.column("x"))
+        self.refresh_lod()
+
+    def refresh_lod(self, *args):
+        view_box = self.plot.getViewBox()
+        width = max(int(view_box.width()), 1)
+        if view_box.autoRangeEnabled()[0]:
+            # the range follows the data, so the whole series must be drawn
+            x0, x1 = -np.inf, np.inf
+        else:
+            x0, x1 = view_box.viewRange()[0]
+
+        for curve, lod in self.lod_curves:
+            if len(lod):
+                x, y = lod.query(x0, x1, width)
+                curve.setData(x=x, y=y)
+
+    def convert_cv_qt(self, rgb_image):
+        """Convert from an RGB image to QPixmap"""
         h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
+        # the QImage wraps the array's buffer, fromImage makes the only copy
         convert_to_Qt_format = QtGui.QImage(
-            rgb_image.data, w, h, bytes_per_line, QtGui.QImage.Format_RGB888
-        )
-        p = convert_to_Qt_format.scaled(
-            self.disply_width, self.display_height, Qt.KeepAspectRatio
+            rgb_image.data, w, h, rgb_image.strides[0], QtGui.QImage.Format_RGB888
         )
-        return QPixmap.fromImage(p)
+        return QPixmap.fromImage(convert_to_Qt_format)
 
     def closeEvent(self, event):
+        if self.fit_worker:
+            self.fit_worker.cancel()
+            self.fit_worker.wait()
         if self.thread:
             self.thread.stop()
             event.accept()
@@ -316,7 +401,7 @@ class AppWindow(QWidget):
         self.mask_options.setEnabled(not running)
         self.url_button.setEnabled(not running)
         self.draw_param_button.setEnabled(not running)
-        self.analyze_widget.setEnabled(not running)
+        self.analyze_widget.setEnabled(True)
 
         self.stop_button.setEnabled(running)
         self.hsv_slider.setEnabled(running)
@@ -332,22 +417,28 @@ class AppWindow(QWidget):
                 display_option=self.selected_display_option,
                 mask_option=self.selected_mask_option,
                 draw_params=self.draw_params,
+                display_size=(self.video_label.width(), self.video_label.height()),
+                display_fps=self.screen().refreshRate(),
+                cache=self.detection_cache,
+                metrics=self.metrics,
             )
+            self.metrics.reset()
             # Clear all data and plots before running
+            self.last_fit_params = None
             self.data_points.clear()
-            self.position_plot_data.clear()
-            self.fitted_plot_data.clear()
-            self.upper_decay_plot.clear()
-            self.lower_decay_plot.clear()
+            for curve, lod in self.lod_curves:
+                lod.clear()
+                curve.clear()
 
             self.thread.finished_signal.connect(self.video_thread_finished)
             self.thread.change_pixmap_signal.connect(self.update_image)
-            self.thread.new_contour_signal.connect(self.update_graph)
+            self.thread.new_points_signal.connect(self.update_graph)
             self.thread.parameter_signal.connect(self.analyze_widget.show_params)
             self.thread.processing_signal.connect(self.processing_frame)
             self.hsv_slider.slider_values_signal.connect(self.thread.update_hsv_range)
 
             self.thread.start()
+            self.plot_timer.start()
             self.update_button_states(running=True)
 
     def stop_video_thread(self):
@@ -362,34 +453,67 @@ class AppWindow(QWidget):
         self.selected_mask_option = selected_option
 
     def video_thread_finished(self):
+        self.plot.setTitle(self.plot_title)
+        self.plot_timer.stop()
+        self.redraw_graph()
         self.update_button_states(False)
 
     def fit_data_point(self):
-        data = np.array(self.data_points)
-        x_data = data[:, 0]
-        y_data = data[:, 1]
-
-        params, _ = curve_fit(
-            underdamped_harmonic_oscillator,
-            x_data,
-            y_data,
-            p0=initial_guess,
-            bounds=(lower_bounds, upper_bounds),
-            maxfev=2500,
-            ftol=1e-6,
+        # A second click on the button cancels the running fit
+        if self.fit_worker and self.fit_worker.isRunning():
+            self.fit_worker.cancel()
+            return
+        self.start_fit()
+
+    def start_fit(self, p0=None):
+        if len(self.data_points) < 5:
+            return
+
+        self.fit_worker = FitWorker(
+            self.data_points.column("frame"),
+            self.data_points.column("x"),
+            p0=p0,
+            warm_start=load_saved_params(),
+            metrics=self.metrics,
         )
+        self.fit_worker.fitted_signal.connect(self.show_fit)
+        self.fit_worker.progress_signal.connect(self.analyze_widget.show_fit_progress)
+        self.fit_worker.failed_signal.connect(self.fit_failed)
+        self.fit_worker.finished.connect(self.analyze_widget.fit_finished)
+        self.fit_worker.start()
+
+    def live_fit_toggled(self, enabled):
+        if enabled:
+            self.live_fit_timer.start()
+        else:
+            self.live_fit_timer.stop()
+
+    def live_refit(self):
+        if not (self.thread and self.thread.isRunning()):
+            return
+        if self.fit_worker and self.fit_worker.isRunning():
+            return
+        # warm start from the previous fit, the track only grew since
+        self.start_fit(p0=self.last_fit_params)
+
+    @pyqtSlot(str)
+    def fit_failed(self, message):
+        print(message)
+
+    @pyqtSlot(np.ndarray, np.ndarray)
+    def show_fit(self, params, x_data):
+        self.last_fit_params = params
 
         # Extract the fitted parameters
         A, gamma, w, phi, C = params
-        self.fitted_plot_data.setData(
-            x=x_data, y=underdamped_harmonic_oscillator(x_data, A, gamma, w, phi, C)
-        )
-
-        self.upper_decay_plot.setData(
-            x=x_data, y=upper_decaying_component_curve(x_data, A, gamma, C)
-        )
-        self.lower_decay_plot.setData(
-            x=x_data, y=lower_decaying_component_curve(x_data, A, gamma, C)
+        curves = (
+            underdamped_harmonic_oscillator(x_data, A, gamma, w, phi, C),
+            upper_decaying_component_curve(x_data, A, gamma, C),
+            lower_decaying_component_curve(x_data, A, gamma, C),
         )
+        for (_, lod), y_data in zip(self.lod_curves[1:], curves):
+            lod.clear()
+            lod.update(x_data, y_data)
+        self.refresh_lod()
 
         self.analyze_widget.update_params(params)
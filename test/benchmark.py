@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the app modules import each other relative to the app folder
+sys.path.append(os.path.join(project_root, 'app'))
+from processing.detector import MASK_OPTIONS
+from processing.engine import TrackingEngine
+from utils.synthetic import render_pendulum_video
+
+STAGES = ('decode', 'detect', 'track', 'fit')
+
+
+def timed(function, samples):
+    # record the duration of every call of a bound method
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+def stage_summary(samples):
+    samples = np.asarray(samples) * 1000
+    if len(samples) == 0:
+        return None
+    return {
+        'total_ms': float(samples.sum()),
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+    }
+
+
+def benchmark_mode(video_path, mask_option, truth, params, roi=False, downscale=1):
+    engine = TrackingEngine(video_path, mask_option, roi=roi, downscale=downscale)
+    samples = {stage: [] for stage in STAGES}
+    engine.detect = timed(engine.detect, samples['detect'])
+
+    start = time.perf_counter()
+    engine.start()
+    frames = engine.read_frames()
+    processed = 0
+    while True:
+        decode_start = time.perf_counter()
+        item = next(frames, None)
+        samples['decode'].append(time.perf_counter() - decode_start)
+        if item is None:
+            break
+        process_start = time.perf_counter()
+        engine.process_frame(*item)
+        # everything in process_frame but detection: calibration and transform
+        samples['track'].append(time.perf_counter() - process_start - samples['detect'][-1])
+        processed += 1
+    engine.finish()
+    engine.release()
+
+    fit_start = time.perf_counter()
+    results = engine.results(processed)
+    samples['fit'].append(time.perf_counter() - fit_start)
+    elapsed = time.perf_counter() - start
+
+    # centroid error against the rendered ground truth
+    track = results['track']
+    true_frames = track['frame'].astype(int) + engine.frame_offset
+    error = np.hypot(track['x'] - truth['x'][true_frames], track['y'] - truth['y'][true_frames])
+
+    # the fit clock starts at frame_offset
+    offset_time = engine.frame_offset / params['fps']
+    expected = {
+        'A': params['length'] * np.sin(params['theta0'] * np.exp(-params['gamma'] * offset_time)),
+        'gamma': params['gamma'],
+        'w': params['omega'],
+        'pivot_x': params['pivot'][0],
+        'pivot_y': params['pivot'][1],
+        'length': params['length'],
+    }
+    a, b, r = results['circle_params']
+    recovered = dict(results['oscillator'] or {})
+    recovered.update(pivot_x=a, pivot_y=b, length=abs(r), angle_rad=float(results['params']['angle_rad']))
+
+    return {
+        'mode': mask_option,
+        'roi': roi,
+        'downscale': downscale,
+        'frames': processed,
+        'fps': processed / elapsed if elapsed > 0 else 0.0,
+        'wall_time': elapsed,
+        'detection_rate': len(track) / processed if processed else 0.0,
+        'stages': {stage: stage_summary(values) for stage, values in samples.items()},
+        'centroid_error_px': {
+            'mean': float(error.mean()) if len(error) else None,
+            'p95': float(np.percentile(error, 95)) if len(error) else None,
+            'max': float(error.max()) if len(error) else None,
+        },
+        'recovered': recovered,
+        'expected': expected,
+        'error': {
+            name: recovered[name] - value if name in recovered else None
+            for name, value in expected.items()
+        },
+        # pivot coordinates depend on the frame origin, so only their error in pixels is meaningful
+        'relative_error': {
+            name: abs(recovered[name] - value) / abs(value) if name in recovered else None
+            for name, value in expected.items()
+            if not name.startswith('pivot')
+        },
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Throughput and accuracy benchmark on a synthetic pendulum video.')
+    parser.add_argument('--frames', type=int, default=1500, help='frames to render')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--fps', type=float, default=60)
+    parser.add_argument('--noise', type=float, default=0.0, help='pixel noise standard deviation')
+    parser.add_argument('--blur', type=float, default=0.0, help='Gaussian blur sigma')
+    parser.add_argument('--tilt', type=float, default=0.0, help='camera tilt in radians')
+    parser.add_argument('--modes', nargs='+', choices=MASK_OPTIONS, default=MASK_OPTIONS)
+    parser.add_argument('--roi', action='store_true', help='also run every mode with ROI tracking')
+    parser.add_argument('--output', default='benchmark.json', help='results JSON file')
+    parser.add_argument('--baseline', help='earlier results JSON to compare fps against')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        video_path = os.path.join(folder, 'pendulum.avi')
+        truth, params = render_pendulum_video(
+            video_path,
+            frames=args.frames,
+            width=args.width,
+            height=args.height,
+            fps=args.fps,
+            noise=args.noise,
+            blur=args.blur,
+            tilt=args.tilt,
+        )
+        runs = []
+        for roi in (False, True) if args.roi else (False,):
+            for mode in args.modes:
+                run = benchmark_mode(video_path, mode, truth, params, roi=roi)
+                runs.append(run)
+                print(f"{mode:<17} roi={roi!s:<5} {run['fps']:8.1f} fps  "
+                      f"detected {run['detection_rate']:.1%}  "
+                      f"centroid error {run['centroid_error_px']['mean'] or float('nan'):.2f} px")
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'cpu_count': os.cpu_count(),
+        },
+        'video': params,
+        'runs': runs,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=float)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(run['mode'], run['roi']): run for run in json.load(f)['runs']}
+        for run in runs:
+            previous = baseline.get((run['mode'], run['roi']))
+            if previous and previous['fps']:
+                print(f"{run['mode']:<17} roi={run['roi']!s:<5} {run['fps'] / previous['fps']:.2f}x baseline fps")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
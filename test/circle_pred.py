@@ -1,9 +1,9 @@
 import os
-import csv
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.optimize import least_squares
 from app.utils.utils import rotated_circle_residuals, get_project_root
+from app.utils.track_file import load_track
 
 project_root = get_project_root(os.path.dirname(os.path.abspath(__file__)))
 data_folder = os.path.join(project_root, 'data')
@@ -14,20 +14,10 @@ def rotated_circle(theta, a, b, r):
     y = b + r * np.sin(theta)
     return x, y
 
-# Read the CSV file
-data_points = []
-with open(os.path.join(data_folder, "csv", "transformed_data.csv"), 'r') as csvfile:
-    csv_reader = csv.reader(csvfile)
-    next(csv_reader)  # Skip the header row
-    for row in csv_reader:
-        cx, cy, time = map(float, row)
-        data_points.append((cx, cy))
-
-cx, cy = zip(*data_points)
-
-# Convert the data to NumPy arrays
-cx = np.array(cx)
-cy = np.array(cy)
+# Memory-map the track (data/csv/transformed_data.csv is the same data as CSV)
+track = load_track(os.path.join(data_folder, "npy", "transformed_data.npy"))
+cx = np.asarray(track["x"], dtype=float)
+cy = np.asarray(track["y"], dtype=float)
 
 # Initial guesses for the parameters
 initial_guess = [0.0, 0.0, 1.0, 0.0]
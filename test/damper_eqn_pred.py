@@ -1,31 +1,26 @@
 import os
-import csv
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
 from app.utils.utils import get_project_root, underdamped_harmonic_oscillator
-from app.utils.contansts import initial_guess, lower_bounds, upper_bounds
+from app.utils.track_file import load_track
 
 project_root = get_project_root(os.path.dirname(os.path.abspath(__file__)))
 data_folder = os.path.join(project_root, 'data')
 
-# Read the CSV file
-data_points = []
-with open(os.path.join(data_folder, "csv", "transformed_data.csv"), 'r') as csvfile:
-    csv_reader = csv.reader(csvfile)
-    next(csv_reader)  # Skip the header row
-    for row in csv_reader:
-        cx, _, time = map(float, row)
-        data_points.append((time, cx))
+# the app modules import each other relative to the app folder
+sys.path.append(os.path.join(project_root, 'app'))
+from processing.fitting import estimate_initial_guess, fit_oscillator, load_saved_params
 
-times, cx_values = zip(*data_points)
+# Memory-map the track (data/csv/transformed_data.csv is the same data as CSV)
+track = load_track(os.path.join(data_folder, "npy", "transformed_data.npy"))
+times = np.asarray(track["time"], dtype=float)
+cx_values = np.asarray(track["x"], dtype=float)
 
-# Convert the data to NumPy arrays
-times = np.array(times)
-cx_values = np.array(cx_values)
-
-# Perform the curve fitting
-params, params_covariance = curve_fit(underdamped_harmonic_oscillator, times, cx_values, p0=initial_guess, bounds=(lower_bounds, upper_bounds))
+# Perform the curve fitting, starting from a guess derived from the data
+initial_guess = estimate_initial_guess(times, cx_values, load_saved_params())
+print("Initial Guess:", initial_guess)
+params = fit_oscillator(times, cx_values, p0=initial_guess)
 
 # Extract the fitted parameters
 A, gamma, w, phi, C = params